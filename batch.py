@@ -0,0 +1,166 @@
+# Lockstep game batches for A Visit from El Chupacabras.
+#
+# Bots and training runs play thousands of games at the same time. Running a
+# Game object for each of them means a Player, a RoomMap and some Rooms per
+# game and a command string to parse every turn. A GameBatch keeps the room
+# id, item bitmask and finished flag of every game in flat arrays instead,
+# about 14 bytes per game, and advances all of them by one action code each
+# with the same rules as Game.process_command and Game.player_outcome.
+#
+# Action codes 0 to 3 are the moves in World.DIRECTIONS, and GET picks up
+# the item in the player's room, like typing "get" and the item's name. Any
+# other code is a command the game doesn't understand and changes nothing.
+#
+# The item bitmasks are unsigned 64-bit integers, so a batch can only play
+# worlds with at most MAX_ITEMS items. Play bigger worlds with Game.
+#
+
+from array import array
+
+from main import RoomFactory, World
+
+# The action code of the "get" command. Codes 0 to 3 are the moves in
+# World.DIRECTIONS.
+GET = World.GET
+# The most items a batch's world can have, one per bit of an item bitmask.
+MAX_ITEMS = 64
+# The reward for the turn a game is won or lost. Every other turn is worth 0.
+WIN_REWARD = 1
+LOSE_REWARD = -1
+
+
+class GameBatch:
+    """
+    A class to play many games in the same world in lockstep.
+
+    Attributes:
+        world (World): The layout of the house.
+        size (int): The number of games in the batch.
+        rooms (array): The id of the room the player is in, by game.
+        items (array): The item bitmask of the player, by game.
+        done (bytearray): 1 for each game that has been won or lost.
+        rewards (array): The reward each game got on the last step.
+
+    Methods:
+        reset(): Starts every game over.
+        reset_game(index): Starts one game over.
+        get_state(index): Returns the state of one game.
+        set_state(index, state): Sets the state of one game.
+        step(actions): Plays one action in every game.
+    """
+    def __init__(self, size, world=None):
+        """
+        Constructs the GameBatch object with every game at the start.
+
+        :param size: The number of games in the batch.
+        :type size: int
+        :param world: The layout of the house. The house in rooms_config is
+            used if it isn't given.
+        :type world: World or None
+        :raises ValueError: If the world has more than MAX_ITEMS items.
+        """
+        if world is None:
+            world = RoomFactory.get_world()
+        if world.total_items > MAX_ITEMS:
+            raise ValueError(f"A GameBatch can only play worlds with at most "
+                             f"{MAX_ITEMS} items, and {world.world_id!r} has "
+                             f"{world.total_items}.")
+        self.world = world
+        self.size = size
+
+        self.rooms = array("i", [world.start_room]) * size
+        self.items = array("Q", [0]) * size
+        self.done = bytearray(size)
+        self.rewards = array("b", [0]) * size
+        self._start_rooms = array("i", self.rooms)
+        self._no_rewards = array("b", self.rewards)
+
+    def reset(self):
+        """
+        Starts every game over, in the start room with no items.
+        """
+        self.rooms[:] = self._start_rooms
+        self.items[:] = array("Q", [0]) * self.size
+        self.done[:] = bytes(self.size)
+        self.rewards[:] = self._no_rewards
+
+    def reset_game(self, index):
+        """
+        Starts one game over, in the start room with no items.
+
+        :param index: The game's position in the batch.
+        :type index: int
+        """
+        self.set_state(index, (self.world.start_room, 0))
+
+    def get_state(self, index):
+        """
+        Returns the state of one game, in the same form as Game.get_state.
+
+        :param index: The game's position in the batch.
+        :type index: int
+        :return: A tuple with the room id and the item bitmask.
+        :rtype: tuple
+        """
+        return self.rooms[index], self.items[index]
+
+    def set_state(self, index, state):
+        """
+        Sets the state of one game from a pair of integers returned by
+        get_state or Game.get_state. The game is marked done if the state is
+        in the villain room.
+
+        :param index: The game's position in the batch.
+        :type index: int
+        :param state: A tuple with the room id and the item bitmask.
+        :type state: tuple
+        """
+        self.rooms[index], self.items[index] = state
+        self.done[index] = state[0] == self.world.villain_room
+
+    def step(self, actions):
+        """
+        Plays one action in every game. Moving toward a wall or getting an
+        item that isn't in the room changes nothing, just like in
+        Game.process_command. Games that are already done ignore their
+        action and get a reward of 0.
+
+        The arrays returned are the batch's own arrays, so they change on
+        the next step. Copy them if they need to be kept.
+
+        :param actions: One action code per game.
+        :type actions: sequence
+        :return: A tuple with the rooms, the item bitmasks, the rewards and
+            the done flags of every game.
+        :rtype: tuple
+        :raises ValueError: If there isn't one action per game.
+        """
+        if len(actions) != self.size:
+            raise ValueError(f"Expected {self.size} actions, got "
+                             f"{len(actions)}.")
+        exits = self.world.exits
+        item_bits = self.world.item_bits
+        villain_room = self.world.villain_room
+        all_items = self.world.all_items
+        rooms = self.rooms
+        items = self.items
+        done = self.done
+        rewards = self.rewards
+        rewards[:] = self._no_rewards
+
+        for index, action in enumerate(actions):
+            if done[index]:
+                continue
+            if action == GET:
+                items[index] |= item_bits[rooms[index]]
+            elif 0 <= action < GET:
+                next_room = exits[action][rooms[index]]
+                if next_room != -1:
+                    rooms[index] = next_room
+                    if next_room == villain_room:
+                        done[index] = 1
+                        if items[index] == all_items:
+                            rewards[index] = WIN_REWARD
+                        else:
+                            rewards[index] = LOSE_REWARD
+        return rooms, items, rewards, done
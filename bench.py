@@ -0,0 +1,388 @@
+# Benchmarks for A Visit from El Chupacabras.
+#
+# It times the engine's hot paths, from creating a Game to playing a whole
+# scripted game, and reports operations per second and the memory each
+# operation allocates. The results are written to bench_output.txt. Pass
+# --compare with an earlier output file to see what got faster or slower.
+# It also measures how long seeking to a turn of a session journal takes
+# as journals get longer, and how much faster replaying many transcripts
+# with a shared start is through a TranscriptTrie.
+#
+# Usage: python bench.py [--output FILE] [--compare FILE] [--sessions N]
+#                        [--checkpoint-interval N]
+#
+
+import argparse
+import gc
+import itertools
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from batch import GameBatch
+from journal import JournalReader, JournalWriter
+from main import WINNING_SCRIPT, Game, RoomFactory, run_transcript
+from mass_replay import TranscriptTrie
+
+# How much slower a benchmark has to be than the compared run to be
+# reported as a regression.
+REGRESSION_THRESHOLD = 0.10
+
+
+def time_operation(operation, min_time=0.2, repeat=3):
+    """
+    Measures how many times per second an operation can run. The operation
+    is run in a loop for at least min_time seconds, and the best of several
+    runs is kept to reduce noise.
+
+    :param operation: A function with no parameters.
+    :type operation: function
+    :param min_time: The shortest time to run each loop for, in seconds.
+    :type min_time: float
+    :param repeat: How many loops to run.
+    :type repeat: int
+    :return: The number of operations per second.
+    :rtype: float
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            operation()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 10:
+            break
+        loops *= 10
+
+    best = elapsed / loops
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            operation()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return 1 / best
+
+
+def measure_allocations(operation):
+    """
+    Measures the most memory an operation has allocated at once while it
+    runs.
+
+    :param operation: A function with no parameters.
+    :type operation: function
+    :return: The peak number of bytes allocated by one operation.
+    :rtype: int
+    """
+    operation()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    operation()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return max(0, peak - before)
+
+
+def bench_memory_per_session(sessions=10000):
+    """
+    Measures how much memory each live Game uses by keeping many of them
+    alive at once. One game is created before measuring so data shared by
+    all games, like the room templates, isn't counted.
+
+    :param sessions: How many games to keep alive.
+    :type sessions: int
+    :return: The average number of bytes allocated per game.
+    :rtype: float
+    """
+    Game()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = [Game() for _ in range(sessions)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del games
+    return (after - before) / sessions
+
+
+def bench_seek(turn_counts=(1000, 10000, 100000), checkpoint_interval=256,
+               seeks=200):
+    """
+    Measures how long it takes to open a session journal and to seek to a
+    random turn in it, for journals of different lengths. Each journal is
+    one long game of random commands that never walks into the villain
+    room, so only checkpoints keep seeks short.
+
+    :param turn_counts: The number of turns of each journal.
+    :type turn_counts: tuple
+    :param checkpoint_interval: The number of commands between two
+        checkpoints, or None for no checkpoints.
+    :type checkpoint_interval: int or None
+    :param seeks: The number of seeks to time in each journal.
+    :type seeks: int
+    :return: A list of (turns, file size in bytes, seconds to open, seconds
+        per seek) tuples.
+    :rtype: list
+    """
+    rng = random.Random(0)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for turn_count in turn_counts:
+            path = os.path.join(directory, f"{turn_count}.journal")
+            game = Game()
+            world = game.world
+            with JournalWriter(path, game,
+                               checkpoint_interval=checkpoint_interval):
+                for _ in range(turn_count):
+                    column = rng.randrange(len(world.DIRECTIONS) + 1)
+                    if column == len(world.DIRECTIONS):
+                        game.process_command("get pro camera")
+                    elif world.exits[column][game.player.room_id] == \
+                            world.villain_room:
+                        game.process_command("hint")
+                    else:
+                        game.process_command(
+                            f"go {world.DIRECTIONS[column]}")
+
+            start = time.perf_counter()
+            reader = JournalReader(path)
+            open_time = time.perf_counter() - start
+            turns = [rng.randint(0, turn_count) for _ in range(seeks)]
+            start = time.perf_counter()
+            for turn in turns:
+                reader.seek(turn, game)
+            seek_time = (time.perf_counter() - start) / seeks
+            results.append((turn_count, os.path.getsize(path), open_time,
+                            seek_time))
+    return results
+
+
+def bench_mass_replay(transcript_count=20000, prefix_count=100):
+    """
+    Measures how long it takes to replay many transcripts one by one with
+    run_transcript and all at once with a TranscriptTrie. Each transcript is
+    the start of one of a few long random games followed by a few random
+    commands, like recorded sessions that mostly open the same way.
+
+    :param transcript_count: The number of transcripts.
+    :type transcript_count: int
+    :param prefix_count: The number of games the transcripts start from.
+    :type prefix_count: int
+    :return: A tuple with the number of commands, the number the trie
+        played, and the seconds taken one by one and with the trie.
+    :rtype: tuple
+    """
+    rng = random.Random(0)
+    commands = [f"go {direction}" for direction in Game().world.DIRECTIONS]
+    commands += ["get goat plushie", "get pro camera", "hint"]
+    prefixes = [[rng.choice(commands) for _ in range(200)]
+                for _ in range(prefix_count)]
+    transcripts = [rng.choice(prefixes)[:rng.randint(0, 200)]
+                   + [rng.choice(commands) for _ in range(rng.randint(0, 5))]
+                   for _ in range(transcript_count)]
+
+    game = Game()
+    start = time.perf_counter()
+    for transcript in transcripts:
+        run_transcript(transcript, game)
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    trie = TranscriptTrie()
+    for transcript in transcripts:
+        trie.add(transcript)
+    trie.replay()
+    trie_time = time.perf_counter() - start
+    return trie.commands, trie.commands_run, single_time, trie_time
+
+
+def get_benchmarks():
+    """
+    Lists the benchmarks. Each one is a name and a function with no
+    parameters that runs the operation once.
+
+    :return: A list of (name, function) tuples.
+    :rtype: list
+    """
+    game = Game()
+    living_room = game.world.room_ids["living room"]
+    # The player in the living room with no items, next to the pro camera.
+    item_state = (living_room, 0)
+    game.set_state(item_state)
+
+    # A second game with the player in the bedroom, which has a wall to the
+    # west.
+    wall_game = Game()
+
+    def go_and_reset():
+        game.process_command("go north")
+        game.set_state(item_state)
+
+    def get_item_and_reset():
+        game.process_command("get pro camera")
+        game.set_state(item_state)
+
+    def move_and_back():
+        game.move_player("north")
+        game.move_player("south")
+
+    # A thousand games stepped together with random actions, started over
+    # once most of them have ended.
+    batch = GameBatch(1000)
+    rng = random.Random(0)
+    batch_actions = itertools.cycle(
+        [[rng.randrange(5) for _ in range(batch.size)] for _ in range(64)])
+
+    def step_batch():
+        if sum(batch.step(next(batch_actions))[3]) > batch.size * 0.9:
+            batch.reset()
+
+    return [
+        ("Game()", Game),
+        ("RoomFactory.create_room",
+         lambda: RoomFactory.create_room("kitchen")),
+        ("Game.reset", game.reset),
+        ("set_state", lambda: game.set_state(item_state)),
+        ("process_command go+set_state", go_and_reset),
+        ("process_command go blocked",
+         lambda: wall_game.process_command("go west")),
+        ("process_command bad direction",
+         lambda: game.process_command("go up")),
+        ("process_command get+set_state", get_item_and_reset),
+        ("process_command get missing",
+         lambda: game.process_command("get rope")),
+        ("process_command invalid", lambda: game.process_command("jump")),
+        ("process_command hint", lambda: game.process_command("hint")),
+        ("move_player x2", move_and_back),
+        ("get_player_status", game.player.get_player_status),
+        ("get_room_status", game.player.current_room.get_room_status),
+        ("player_outcome", game.player_outcome),
+        ("scripted winning game", lambda: run_transcript(WINNING_SCRIPT)),
+        ("scripted game reusing Game",
+         lambda: run_transcript(WINNING_SCRIPT, game)),
+        ("GameBatch.step x1000", step_batch),
+    ]
+
+
+def run_benchmarks(min_time=0.2):
+    """
+    Runs every benchmark.
+
+    :param min_time: The shortest time to run each loop for, in seconds.
+    :type min_time: float
+    :return: A dictionary of (operations per second, bytes allocated)
+        tuples keyed by benchmark name.
+    :rtype: dict
+    """
+    results = {}
+    for name, operation in get_benchmarks():
+        results[name] = (time_operation(operation, min_time),
+                         measure_allocations(operation))
+    return results
+
+
+def write_results(results, path):
+    """
+    Writes benchmark results to a file, one tab-separated line per
+    benchmark.
+
+    :param results: The results returned by run_benchmarks.
+    :type results: dict
+    :param path: The file to write.
+    :type path: str
+    """
+    with open(path, "w") as output_file:
+        output_file.write("benchmark\tops_per_sec\talloc_bytes\n")
+        for name, (ops, alloc) in results.items():
+            output_file.write(f"{name}\t{ops:.1f}\t{alloc}\n")
+
+
+def read_results(path):
+    """
+    Reads benchmark results written by write_results.
+
+    :param path: The file to read.
+    :type path: str
+    :return: A dictionary of (operations per second, bytes allocated)
+        tuples keyed by benchmark name.
+    :rtype: dict
+    """
+    results = {}
+    with open(path) as input_file:
+        next(input_file)
+        for line in input_file:
+            name, ops, alloc = line.rstrip("\n").split("\t")
+            results[name] = (float(ops), int(alloc))
+    return results
+
+
+def format_results(results, previous=None):
+    """
+    Formats benchmark results as a table. If earlier results are given, it
+    adds how the speed changed and marks regressions.
+
+    :param results: The results returned by run_benchmarks.
+    :type results: dict
+    :param previous: Earlier results to compare against.
+    :type previous: dict or None
+    :return: The table.
+    :rtype: str
+    """
+    lines = [f"{'benchmark':32} {'ops/sec':>14} {'alloc B':>9}"]
+    for name, (ops, alloc) in results.items():
+        line = f"{name:32} {ops:14,.0f} {alloc:9d}"
+        if previous and name in previous:
+            change = ops / previous[name][0] - 1
+            line += f" {change:+8.1%}"
+            if change < -REGRESSION_THRESHOLD:
+                line += " REGRESSION"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main():
+    """
+    The entry point for the benchmarks. Runs them, prints the results, and
+    writes them to the output file.
+
+    :return: Nothing
+    :rtype: None
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark A Visit from El Chupacabras.")
+    parser.add_argument("--output", default="bench_output.txt")
+    parser.add_argument("--compare",
+                        help="An earlier output file to compare against.")
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--checkpoint-interval", type=int, default=256,
+                        help="Commands between journal checkpoints in the "
+                             "seek benchmark, or 0 for none.")
+    args = parser.parse_args()
+
+    previous = read_results(args.compare) if args.compare else None
+    results = run_benchmarks(args.min_time)
+    write_results(results, args.output)
+    print(format_results(results, previous))
+
+    per_session = bench_memory_per_session(args.sessions)
+    print(f"\nmemory per session: {per_session:.0f} bytes "
+          f"({args.sessions} sessions)")
+
+    print(f"\n{'journal turns':>13} {'bytes':>10} {'open ms':>9} "
+          f"{'seek us':>9}")
+    for turns, size, open_time, seek_time in bench_seek(
+            checkpoint_interval=args.checkpoint_interval or None):
+        print(f"{turns:13,d} {size:10,d} {open_time * 1e3:9.2f} "
+              f"{seek_time * 1e6:9.1f}")
+
+    commands, commands_run, single_time, trie_time = bench_mass_replay()
+    print(f"\nmass replay: {single_time:.2f} s one by one, "
+          f"{trie_time:.2f} s with a trie ({commands_run:,d} of "
+          f"{commands:,d} commands played)")
+
+
+if __name__ == '__main__':
+    main()
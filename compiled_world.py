@@ -0,0 +1,405 @@
+# A compiled binary format for worlds.
+#
+# Parsing a JSON or TOML world with a million rooms takes much longer than
+# the games played in it. compile_world writes a World to a binary file with
+# packed exit tables, one table of interned strings, and item records, and
+# MappedWorld reads it back through mmap without parsing anything. Rooms are
+# only turned into Python objects when a game asks for them, and every
+# process that maps the same file shares one copy of it in memory.
+#
+# The file is little-endian and laid out as:
+#
+#   header        MAGIC, then the counts, the start and villain rooms, the
+#                 world id and the offset of every section
+#   strings       the offset of each interned string, then their UTF-8 bytes
+#   room_names    the string number of each room's name
+#   exits         one column per direction in DIRECTIONS with the id of the
+#                 room in that direction, or -1
+#   room_items    the item number in each room, or -1
+#   name_index    the room ids sorted by name, to look rooms up by name
+#   item records  the room, name string and use string of each item
+#   metadata      the world's WorldReport as UTF-8 JSON, so loading a
+#                 compiled world doesn't analyze it again
+#
+# Usage: python compiled_world.py WORLD_FILE OUTPUT_FILE
+#
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+from types import MappingProxyType
+
+from main import (ExitAdjacency, RoomFactory, RoomTemplate, TemplateCache,
+                  World, WorldReport)
+
+MAGIC = b"CHUPAW02"
+DIRECTIONS = World.DIRECTIONS
+# The most bytes of UTF-8 a compiled world's id can take.
+WORLD_ID_SIZE = 64
+# The counts, the start room, the villain room, the world id, and the
+# offsets of the sections after the header.
+HEADER = struct.Struct(f"<8s5I{WORLD_ID_SIZE}s11Q")
+SECTIONS = ("string_offsets", "string_data", "room_names", "exits",
+            "room_items", "name_index", "item_rooms", "item_names",
+            "item_uses", "metadata", "end")
+
+
+def compile_world(world, path):
+    """
+    Writes a World to a binary world file. Only the exits the player can
+    use are written, and the world's report is stored with it.
+
+    :param world: The world to compile.
+    :type world: World
+    :param path: The file to write.
+    :type path: str
+    :raises ValueError: If the world's id takes more than WORLD_ID_SIZE
+        bytes.
+    """
+    world_id = world.world_id.encode()
+    if len(world_id) > WORLD_ID_SIZE:
+        raise ValueError(f"The world id {world.world_id!r} is longer than "
+                         f"{WORLD_ID_SIZE} bytes, so it can't be compiled.")
+    strings = []
+    string_numbers = {}
+
+    def intern(text):
+        number = string_numbers.get(text)
+        if number is None:
+            number = len(strings)
+            string_numbers[text] = number
+            strings.append(text.encode())
+        return number
+
+    room_count = len(world.room_names)
+    room_names = array("I", (intern(name) for name in world.room_names))
+    exits = array("i")
+    for column in world.exits:
+        exits.extend(column)
+    room_items = array("i", [-1]) * room_count
+    item_names = array("I")
+    item_uses = array("I")
+    for room_id in world.item_rooms:
+        item = world.templates[room_id].item
+        room_items[room_id] = len(item_names)
+        item_names.append(intern(item["item_name"]))
+        item_uses.append(intern(item["item_use"]))
+    item_rooms = array("I", world.item_rooms)
+    name_index = array("I", sorted(range(room_count),
+                                   key=lambda room_id: strings[
+                                       room_names[room_id]]))
+
+    string_offsets = array("Q", [0])
+    for encoded in strings:
+        string_offsets.append(string_offsets[-1] + len(encoded))
+    string_data = b"".join(strings)
+    metadata = json.dumps({"errors": world.report.errors,
+                           "warnings": world.report.warnings}).encode()
+
+    sections = [string_offsets, string_data, room_names, exits, room_items,
+                name_index, item_rooms, item_names, item_uses, metadata, b""]
+    offsets = []
+    position = HEADER.size
+    for section in sections:
+        position += -position % 8
+        offsets.append(position)
+        position += len(bytes(section))
+
+    with open(path, "wb") as world_file:
+        world_file.write(HEADER.pack(
+            MAGIC, room_count, len(world.item_names), len(strings),
+            world.start_room, world.villain_room,
+            world_id, *offsets))
+        for offset, section in zip(offsets, sections):
+            world_file.write(b"\0" * (offset - world_file.tell()))
+            if sys.byteorder != "little" and isinstance(section, array):
+                section = array(section.typecode, section)
+                section.byteswap()
+            world_file.write(bytes(section))
+
+
+def read_world_id(header, path):
+    """
+    Returns the world id stored in the header of a compiled world file, so
+    a loaded world can be found without mapping the file again.
+
+    :param header: The first HEADER.size bytes of the file.
+    :type header: bytes
+    :param path: The file, for error messages.
+    :type path: str
+    :return: The world id.
+    :rtype: str
+    :raises ValueError: If the header isn't a compiled world's, or its
+        world id isn't valid UTF-8.
+    """
+    if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a compiled world file.")
+    world_id = HEADER.unpack_from(header)[6].rstrip(b"\0")
+    try:
+        return world_id.decode()
+    except UnicodeDecodeError:
+        raise ValueError(f"The world id in {path} isn't valid UTF-8, so "
+                         f"the file is damaged.") from None
+
+
+class MappedStrings(Sequence):
+    """
+    A class to read strings from one of the string number tables of a
+    MappedWorld, decoding each string only when it is asked for.
+    """
+    def __init__(self, world, numbers):
+        """
+        Constructs the MappedStrings object.
+
+        :param world: The world the strings are in.
+        :type world: MappedWorld
+        :param numbers: The string number of each entry.
+        :type numbers: memoryview
+        """
+        self.world = world
+        self.numbers = numbers
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self.world.get_string(self.numbers[index])
+
+
+class MappedRoomIds(Mapping):
+    """
+    A class to look up room ids by name in a MappedWorld with a binary
+    search over its name index, without building a dictionary of every
+    room.
+    """
+    def __init__(self, world):
+        """
+        Constructs the MappedRoomIds object.
+
+        :param world: The world the rooms are in.
+        :type world: MappedWorld
+        """
+        self.world = world
+
+    def __len__(self):
+        return len(self.world.room_names)
+
+    def __iter__(self):
+        return iter(self.world.room_names)
+
+    def __getitem__(self, name):
+        world = self.world
+        encoded = name.encode()
+        low = 0
+        high = len(world.name_index)
+        while low < high:
+            middle = (low + high) // 2
+            room_id = world.name_index[middle]
+            if world.get_string_bytes(world.room_name_numbers[room_id]) \
+                    < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(world.name_index):
+            room_id = world.name_index[low]
+            if world.room_names[room_id] == name:
+                return room_id
+        raise KeyError(name)
+
+
+class MappedWorld(World):
+    """
+    A class to represent a World read from a compiled world file through
+    mmap. It has the same attributes and methods as World, but its rooms
+    and strings are read from the file when they are used.
+
+    Attributes:
+        exits (tuple): One memoryview of room ids per direction in
+            DIRECTIONS, read straight from the file, with -1 where there is
+            no exit.
+        room_items (memoryview): The item number in each room, or -1.
+        item_bits (list): The item bit of each room, or 0. It is built from
+            room_items the first time it is asked for.
+        adjacency (ExitAdjacency): The moves out of each room, read from
+            the exit columns when they are asked for.
+
+    Methods:
+        get_string(number): Returns an interned string.
+        get_string_bytes(number): Returns the UTF-8 bytes of an interned
+            string.
+        analyze(): Returns the report stored in the file.
+        build_template(room_id): Builds the RoomTemplate of a room.
+        close(): Releases the memory map.
+    """
+    def __init__(self, path):
+        """
+        Constructs the MappedWorld object by mapping a compiled world file.
+
+        :param path: The compiled world file.
+        :type path: str
+        :raises ValueError: If the file isn't a compiled world file.
+        """
+        if sys.byteorder != "little":
+            raise ValueError("Compiled worlds can only be mapped on "
+                             "little-endian machines.")
+        with open(path, "rb") as world_file:
+            self._map = mmap.mmap(world_file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        self.world_id = read_world_id(self._map[:HEADER.size], path)
+        fields = HEADER.unpack_from(self._view)
+        (room_count, item_count, string_count, self.start_room,
+         self.villain_room) = fields[1:6]
+        offsets = dict(zip(SECTIONS, fields[7:]))
+
+        self._views = []
+        self._item_bits = None
+
+        def section(name, typecode, count):
+            start = offsets[name]
+            size = struct.calcsize(typecode) * count
+            view = self._view[start:start + size].cast(typecode)
+            self._views.append(view)
+            return view
+
+        self.string_offsets = section("string_offsets", "Q",
+                                      string_count + 1)
+        self._string_data = offsets["string_data"]
+        self.room_name_numbers = section("room_names", "I", room_count)
+        all_exits = section("exits", "i", room_count * len(DIRECTIONS))
+        self.exits = tuple(
+            all_exits[column * room_count:(column + 1) * room_count]
+            for column in range(len(DIRECTIONS)))
+        self._views.extend(self.exits)
+        self.room_items = section("room_items", "i", room_count)
+        self.name_index = section("name_index", "I", room_count)
+        self.item_rooms = section("item_rooms", "I", item_count)
+        self.item_name_numbers = section("item_names", "I", item_count)
+        self.item_use_numbers = section("item_uses", "I", item_count)
+
+        self.room_names = MappedStrings(self, self.room_name_numbers)
+        self.room_ids = MappedRoomIds(self)
+        self.templates = TemplateCache(self)
+        self.item_names = MappedStrings(self, self.item_name_numbers)
+        self.item_room_ids = dict(zip(self.item_names, self.item_rooms))
+        self.adjacency = ExitAdjacency(self)
+        self.total_items = item_count
+        self.all_items = (1 << item_count) - 1
+
+        metadata = json.loads(
+            self._map[offsets["metadata"]:offsets["end"]].rstrip(b"\0"))
+        self.report = WorldReport(metadata["errors"], metadata["warnings"])
+
+    @property
+    def item_bits(self):
+        """
+        The bit of each room's item in a player's item bitmask, by room id,
+        or 0 if the room has no item.
+
+        :rtype: list
+        """
+        if self._item_bits is None:
+            self._item_bits = [0 if item_number == -1 else 1 << item_number
+                               for item_number in self.room_items]
+        return self._item_bits
+
+    def get_string_bytes(self, number):
+        """
+        Returns the UTF-8 bytes of an interned string.
+
+        :param number: The string's number.
+        :type number: int
+        :rtype: bytes
+        """
+        start = self._string_data + self.string_offsets[number]
+        end = self._string_data + self.string_offsets[number + 1]
+        return self._map[start:end]
+
+    def get_string(self, number):
+        """
+        Returns an interned string.
+
+        :param number: The string's number.
+        :type number: int
+        :rtype: str
+        """
+        return self.get_string_bytes(number).decode()
+
+    def analyze(self):
+        """
+        Returns a copy of the report compile_world stored in the file. The
+        warnings about exits the player can't use come from the world
+        definition, which isn't in the file, so the world isn't checked
+        again.
+
+        :return: The errors and warnings found when the world was compiled.
+        :rtype: WorldReport
+        """
+        return WorldReport(list(self.report.errors),
+                           list(self.report.warnings))
+
+    def build_template(self, room_id):
+        """
+        Builds the RoomTemplate of a room from the file.
+
+        :param room_id: The room's id.
+        :type room_id: int
+        :rtype: RoomTemplate
+        """
+        exits = {}
+        for direction, column in zip(DIRECTIONS, self.exits):
+            next_room = column[room_id]
+            if next_room != -1:
+                exits[direction] = self.room_names[next_room]
+        item = None
+        item_bit = 0
+        item_number = self.room_items[room_id]
+        if item_number != -1:
+            item = MappingProxyType({
+                "item_name": self.get_string(
+                    self.item_name_numbers[item_number]),
+                "item_use": self.get_string(
+                    self.item_use_numbers[item_number])})
+            item_bit = 1 << item_number
+        return RoomTemplate(self.room_names[room_id], item,
+                            MappingProxyType(exits), room_id, item_bit,
+                            self.world_id)
+
+    def close(self):
+        """
+        Releases the memory map. The world can't be used afterwards.
+        """
+        for view in reversed(self._views):
+            view.release()
+        self._view.release()
+        self._map.close()
+
+
+def main():
+    """
+    The entry point for the compiler. Compiles a JSON or TOML world
+    definition file into a binary world file.
+
+    :return: Nothing
+    :rtype: None
+    """
+    parser = argparse.ArgumentParser(
+        description="Compile a world definition file to a binary world.")
+    parser.add_argument("world_file")
+    parser.add_argument("output_file")
+    args = parser.parse_args()
+
+    world = RoomFactory.load_world(args.world_file)
+    compile_world(world, args.output_file)
+    print(f"Compiled {len(world.room_names)} rooms and "
+          f"{world.total_items} items to {args.output_file}")
+
+
+if __name__ == '__main__':
+    main()
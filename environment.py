@@ -0,0 +1,252 @@
+# Reinforcement learning environments for A Visit from El Chupacabras.
+#
+# GameEnv wraps a Game in the reset()/step(action) interface used by Gym and
+# Gymnasium, without depending on either. Actions are the codes used by
+# GameBatch: 0 to 3 move in World.DIRECTIONS and World.GET picks up the
+# item in the room, so no command strings are built or parsed. An
+# observation is a one-hot vector of the player's room followed by one entry
+# per item, set to 1 if the player has picked it up.
+#
+# VectorGameEnv steps many games at once on a GameBatch for training runs
+# that need millions of steps per second. Its observations are the batch's
+# room id and item bitmask arrays, which encode_observation turns into the
+# same vectors GameEnv returns. Games that end are started over right away,
+# and their last state is passed back in the step's info.
+#
+
+from batch import LOSE_REWARD, WIN_REWARD, GameBatch
+from main import Game, RoomFactory, World
+
+# The number of actions: the four moves and World.GET.
+ACTION_COUNT = World.GET + 1
+
+
+def encode_observation(world, room_id, items):
+    """
+    Turns a game's state into an observation vector: a one-hot vector of
+    the rooms, followed by one entry per item in the order of
+    World.item_names.
+
+    :param world: The layout of the house.
+    :type world: World
+    :param room_id: The id of the room the player is in.
+    :type room_id: int
+    :param items: The player's item bitmask.
+    :type items: int
+    :return: The observation, with room_count + total_items entries.
+    :rtype: bytearray
+    """
+    room_count = len(world.room_names)
+    observation = bytearray(room_count + world.total_items)
+    observation[room_id] = 1
+    index = room_count
+    while items:
+        observation[index] = items & 1
+        items >>= 1
+        index += 1
+    return observation
+
+
+class GameEnv:
+    """
+    A class to play one game as a reinforcement learning environment.
+
+    Attributes:
+        game (Game): The game being played.
+        max_steps (int): The number of steps after which a game is stopped
+            and reported as truncated.
+        steps (int): The number of steps taken in the current game.
+        observation_size (int): The length of each observation.
+
+    Methods:
+        reset(): Starts a new game and returns its first observation.
+        step(action): Plays one action.
+        render(): Describes the player's room and inventory.
+    """
+    def __init__(self, world=None, max_steps=1000):
+        """
+        Constructs the GameEnv object.
+
+        :param world: The layout of the house. The house in rooms_config is
+            used if it isn't given.
+        :type world: World or None
+        :param max_steps: The number of steps after which a game is stopped.
+        :type max_steps: int
+        """
+        self.game = Game(world)
+        self.max_steps = max_steps
+        self.steps = 0
+        self.observation_size = (len(self.game.world.room_names)
+                                 + self.game.world.total_items)
+
+    def reset(self):
+        """
+        Starts a new game.
+
+        :return: A tuple with the first observation and an empty info
+            dictionary.
+        :rtype: tuple
+        """
+        self.game.reset()
+        self.steps = 0
+        return encode_observation(self.game.world,
+                                  *self.game.get_state()), {}
+
+    def step(self, action):
+        """
+        Plays one action, with the same rules as Game.process_command and
+        GameBatch.step. Moving toward a wall, using GET in a room with no
+        item, or any code that isn't an action changes nothing but still
+        uses up a step.
+
+        :param action: An action code from 0 to ACTION_COUNT - 1.
+        :type action: int
+        :return: A tuple with the observation, the reward, whether the game
+            was won or lost, whether it was stopped after max_steps, and an
+            info dictionary with the outcome.
+        :rtype: tuple
+        """
+        game = self.game
+        if action == World.GET:
+            room = game.player.current_room
+            if room.has_item():
+                game.player.get_item(room.item["item_name"])
+        elif 0 <= action < World.GET:
+            game.move_player(World.DIRECTIONS[action])
+        self.steps += 1
+
+        outcome = game.player_outcome()
+        reward = 0
+        if outcome == "won":
+            reward = WIN_REWARD
+        elif outcome == "lost":
+            reward = LOSE_REWARD
+        truncated = outcome is None and self.steps >= self.max_steps
+        observation = encode_observation(game.world, *game.get_state())
+        return (observation, reward, outcome is not None, truncated,
+                {"outcome": outcome})
+
+    def render(self):
+        """
+        Describes the player's room and inventory.
+
+        :return: The player's status.
+        :rtype: str
+        """
+        return self.game.player.get_player_status()
+
+
+class VectorGameEnv:
+    """
+    A class to play many games at once as a reinforcement learning
+    environment, on a GameBatch.
+
+    Attributes:
+        batch (GameBatch): The games being played.
+        size (int): The number of games.
+        max_steps (int): The number of steps after which a game is stopped
+            and reported as truncated.
+
+    Methods:
+        reset(): Starts every game over and returns their observations.
+        step(actions): Plays one action in every game.
+        get_observation(index): Returns the observation vector of one game.
+    """
+    def __init__(self, size, world=None, max_steps=1000):
+        """
+        Constructs the VectorGameEnv object.
+
+        :param size: The number of games.
+        :type size: int
+        :param world: The layout of the house. The house in rooms_config is
+            used if it isn't given.
+        :type world: World or None
+        :param max_steps: The number of steps after which a game is stopped.
+        :type max_steps: int
+        """
+        if world is None:
+            world = RoomFactory.get_world()
+        self.batch = GameBatch(size, world)
+        self.size = size
+        self.max_steps = max_steps
+        self._step = 0
+        self._started = [0] * size
+        # The games to check for truncation, keyed by the step they run out
+        # of steps on. Games that ended earlier are skipped when checked.
+        self._deadlines = {max_steps: list(range(size))}
+
+    def reset(self):
+        """
+        Starts every game over.
+
+        :return: A tuple with the rooms and item bitmasks of every game and
+            an empty info dictionary.
+        :rtype: tuple
+        """
+        self.batch.reset()
+        self._step = 0
+        self._started = [0] * self.size
+        self._deadlines = {self.max_steps: list(range(self.size))}
+        return (self.batch.rooms, self.batch.items), {}
+
+    def step(self, actions):
+        """
+        Plays one action in every game. Games that are won, lost or stopped
+        after max_steps are started over, and the state they ended in is
+        put in the info dictionary.
+
+        The arrays returned are the batch's own arrays, so they change on
+        the next step. Copy them if they need to be kept.
+
+        :param actions: One action code per game.
+        :type actions: sequence
+        :return: A tuple with the rooms and item bitmasks of every game, the
+            rewards, the games that were won or lost, the games that were
+            stopped, and an info dictionary with the final (room id, item
+            bitmask) state of each game that ended, keyed by its index.
+        :rtype: tuple
+        """
+        batch = self.batch
+        rooms, items, rewards, done = batch.step(actions)
+        self._step += 1
+        terminated = bytes(done)
+        truncated = bytearray(self.size)
+        final_states = {}
+
+        index = done.find(1)
+        while index != -1:
+            final_states[index] = batch.get_state(index)
+            self._restart(index)
+            index = done.find(1, index + 1)
+        for index in self._deadlines.pop(self._step, ()):
+            if self._started[index] == self._step - self.max_steps:
+                truncated[index] = 1
+                final_states[index] = batch.get_state(index)
+                self._restart(index)
+
+        return ((rooms, items), rewards, terminated, truncated,
+                {"final_states": final_states})
+
+    def get_observation(self, index):
+        """
+        Returns the observation vector of one game, in the same form as the
+        observations of GameEnv.
+
+        :param index: The game's position in the batch.
+        :type index: int
+        :rtype: bytearray
+        """
+        return encode_observation(self.batch.world,
+                                  *self.batch.get_state(index))
+
+    def _restart(self, index):
+        """
+        Starts one game over and schedules its truncation check.
+
+        :param index: The game's position in the batch.
+        :type index: int
+        """
+        self.batch.reset_game(index)
+        self._started[index] = self._step
+        self._deadlines.setdefault(self._step + self.max_steps,
+                                   []).append(index)
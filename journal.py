@@ -0,0 +1,414 @@
+# Session journals for A Visit from El Chupacabras.
+#
+# A JournalWriter listens to a Game and appends an event to a file for every
+# command the player types and every time the game's state is set, like
+# when a new game starts. Each event holds the command, what it did, the
+# state it left the game in, and the outcome if the game ended. Events are
+# packed into a buffer and written in batches, so recording a turn costs
+# about a microsecond.
+#
+# replay rebuilds the game at any event of a journal by starting from the
+# last time the state was set and typing the recorded commands into
+# Game.process_command, checking every state along the way, so a journal
+# can be trusted for support and auditing. Nothing is printed or rendered
+# while replaying.
+#
+# The writer also records a CHECKPOINT of the state every
+# checkpoint_interval commands. A JournalReader reads a journal once and
+# seeks to any turn by restoring the nearest checkpoint before it and
+# replaying only the commands after it, so jumping to turn 9,000 of a long
+# session replays at most checkpoint_interval commands.
+#
+# A journal file is little-endian and laid out as MAGIC, the length of the
+# world id and the world id, then the events. Each event is packed with
+# EVENT and followed by the UTF-8 bytes of its command. The item bitmask is
+# stored in 64 bits, so only worlds with at most MAX_ITEMS items can be
+# recorded.
+#
+# Usage: python journal.py JOURNAL_FILE [--world FILE] [--turn K]
+#
+
+import argparse
+import bisect
+import struct
+from collections import namedtuple
+
+from main import Game, RoomFactory
+
+MAGIC = b"CHUPAJ01"
+HEADER = struct.Struct("<8sH")
+# The kind, the outcome, the room id and item bitmask after the event, and
+# the length of the command.
+EVENT = struct.Struct("<BBiQH")
+# The most items a journal's world can have, one per bit of the bitmask.
+MAX_ITEMS = 64
+
+# The kinds of event. STARTED is a state set with Game.set_state, like a new
+# game. IGNORED is a command that didn't change the state, like a move into
+# a wall or a hint. CHECKPOINT is a copy of the state for seeking, not a
+# change.
+STARTED = 0
+MOVED = 1
+PICKED = 2
+IGNORED = 3
+CHECKPOINT = 4
+KIND_NAMES = ("started", "moved", "picked", "ignored", "checkpoint")
+# The kinds of event a replay can start from.
+RESTORE_KINDS = (STARTED, CHECKPOINT)
+# The outcomes, by the number stored in an event.
+OUTCOMES = (None, "won", "lost")
+
+
+class JournalEvent(namedtuple("JournalEvent", ["kind", "outcome", "room_id",
+                                               "items", "command"])):
+    """
+    A class to represent one event of a journal.
+
+    Attributes:
+        kind (int): STARTED, MOVED, PICKED, IGNORED or CHECKPOINT.
+        outcome (str or None): "won" or "lost" if the event ended the game.
+        room_id (int): The id of the player's room after the event.
+        items (int): The player's item bitmask after the event.
+        command (str or None): The command typed, or None for STARTED and
+            CHECKPOINT.
+    """
+    __slots__ = ()
+
+
+class JournalWriter:
+    """
+    A class to record a Game's commands and state changes in a journal
+    file.
+
+    Attributes:
+        game (Game): The game being recorded.
+        path (str): The journal file.
+        flush_size (int): The number of bytes of events to buffer before
+            writing them.
+        checkpoint_interval (int or None): The number of commands between
+            two checkpoints, or None for no checkpoints.
+
+    Methods:
+        record(game, command, previous_state): Records an event. It is the
+            listener added to the game.
+        flush(): Writes the buffered events to the file.
+        close(): Writes the buffered events and stops recording.
+    """
+    def __init__(self, path, game, flush_size=65536,
+                 checkpoint_interval=256):
+        """
+        Constructs the JournalWriter object and starts recording. Events are
+        appended if the file already exists, and the game's current state is
+        recorded as a STARTED event.
+
+        :param path: The journal file.
+        :type path: str
+        :param game: The game to record.
+        :type game: Game
+        :param flush_size: The number of bytes of events to buffer before
+            writing them.
+        :type flush_size: int
+        :param checkpoint_interval: The number of commands between two
+            checkpoints, or None for no checkpoints.
+        :type checkpoint_interval: int or None
+        :raises ValueError: If the game's world has more than MAX_ITEMS
+            items.
+        """
+        if game.world.total_items > MAX_ITEMS:
+            raise ValueError(f"A journal can only record worlds with at "
+                             f"most {MAX_ITEMS} items, and "
+                             f"{game.world.world_id!r} has "
+                             f"{game.world.total_items}.")
+        self.game = game
+        self.path = path
+        self.flush_size = flush_size
+        self.checkpoint_interval = checkpoint_interval
+        self._commands = 0
+        self._file = open(path, "ab")
+        self._buffer = bytearray()
+        if self._file.tell() == 0:
+            world_id = game.world.world_id.encode()
+            self._buffer += HEADER.pack(MAGIC, len(world_id)) + world_id
+        self.record(game, None, None)
+        game.add_listener(self.record)
+
+    def record(self, game, command, previous_state):
+        """
+        Records an event for a command or a state change. It is the listener
+        added to the game.
+
+        :param game: The game that changed.
+        :type game: Game
+        :param command: The command typed, or None if the state was set.
+        :type command: str or None
+        :param previous_state: The state before the change.
+        :type previous_state: tuple or None
+        """
+        player = game.player
+        room_id = player.room_id
+        items = player.items
+        if command is None:
+            kind = STARTED
+            encoded = b""
+            self._commands = 0
+        else:
+            if room_id != previous_state[0]:
+                kind = MOVED
+            elif items != previous_state[1]:
+                kind = PICKED
+            else:
+                kind = IGNORED
+            encoded = command.encode()[:0xFFFF]
+        outcome = 0
+        if room_id == game.world.villain_room:
+            outcome = 1 if items == game.world.all_items else 2
+        self._buffer += EVENT.pack(kind, outcome, room_id, items,
+                                   len(encoded))
+        self._buffer += encoded
+        if command is not None and self.checkpoint_interval:
+            self._commands += 1
+            if self._commands >= self.checkpoint_interval:
+                self._buffer += EVENT.pack(CHECKPOINT, outcome, room_id,
+                                           items, 0)
+                self._commands = 0
+        if len(self._buffer) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered events to the file.
+        """
+        self._file.write(self._buffer)
+        self._file.flush()
+        self._buffer.clear()
+
+    def close(self):
+        """
+        Writes the buffered events, stops recording the game and closes the
+        file.
+        """
+        if self._file.closed:
+            return
+        self.game.remove_listener(self.record)
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_journal(path):
+    """
+    Reads a journal file.
+
+    :param path: The journal file.
+    :type path: str
+    :return: A tuple with the world id and the list of JournalEvents.
+    :rtype: tuple
+    :raises ValueError: If the file isn't a journal.
+    """
+    with open(path, "rb") as journal_file:
+        data = journal_file.read()
+    magic, length = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a journal file.")
+    offset = HEADER.size
+    world_id = data[offset:offset + length].decode()
+    offset += length
+
+    events = []
+    while offset + EVENT.size <= len(data):
+        kind, outcome, room_id, items, length = EVENT.unpack_from(data,
+                                                                  offset)
+        offset += EVENT.size
+        command = None
+        if kind not in RESTORE_KINDS:
+            command = data[offset:offset + length].decode(errors="replace")
+        offset += length
+        events.append(JournalEvent(kind, OUTCOMES[outcome], room_id, items,
+                                   command))
+    return world_id, events
+
+
+def replay_events(game, events, start, end):
+    """
+    Replays events on a game: the state of the event at start is set, then
+    the commands of the events after it up to end are typed, and the state
+    after each one is checked against the journal.
+
+    :param game: The game to replay on.
+    :type game: Game
+    :param events: The journal's events.
+    :type events: list
+    :param start: The index of the event to start from. It must be a
+        STARTED or CHECKPOINT event, or an event whose state is known to be
+        right.
+    :type start: int
+    :param end: The index of the last event to replay.
+    :type end: int
+    :raises ValueError: If a command doesn't lead to the state recorded in
+        the journal.
+    """
+    event = events[start]
+    game.set_state((event.room_id, event.items))
+    for index in range(start + 1, end + 1):
+        event = events[index]
+        if event.kind == STARTED:
+            game.set_state((event.room_id, event.items))
+            continue
+        if event.kind != CHECKPOINT:
+            game.process_command(event.command)
+        if game.player.room_id != event.room_id or \
+                game.player.items != event.items:
+            raise ValueError(f"Event {index} of the journal, "
+                             f"{event.command!r}, doesn't lead to the "
+                             f"recorded state.")
+
+
+class JournalReader:
+    """
+    A class to read a journal once and rebuild its game at any turn.
+
+    Attributes:
+        world_id (str): The world_id of the journal's world.
+        events (list): The journal's JournalEvents.
+        turns (list): The index of the event of every command, in order.
+        restore_points (list): The indexes of the STARTED and CHECKPOINT
+            events.
+
+    Methods:
+        seek_event(position, game): Rebuilds the game after an event.
+        seek(turn, game): Rebuilds the game after a turn.
+    """
+    def __init__(self, path):
+        """
+        Constructs the JournalReader object by reading a journal file.
+
+        :param path: The journal file.
+        :type path: str
+        :raises ValueError: If the file isn't a journal.
+        """
+        self.world_id, self.events = read_journal(path)
+        self.turns = []
+        self.restore_points = []
+        for index, event in enumerate(self.events):
+            if event.kind in RESTORE_KINDS:
+                self.restore_points.append(index)
+            else:
+                self.turns.append(index)
+
+    def seek_event(self, position, game=None):
+        """
+        Rebuilds the game as it was after an event, by restoring the nearest
+        STARTED or CHECKPOINT event before it and replaying the commands
+        from there.
+
+        :param position: The index of the event. Negative indexes count
+            from the end.
+        :type position: int
+        :param game: A Game to reuse instead of creating a new one. It must
+            be in the journal's world.
+        :type game: Game or None
+        :return: The game, in the state it was in after the event.
+        :rtype: Game
+        :raises ValueError: If the journal doesn't match its commands.
+        :raises KeyError: If the journal's world hasn't been loaded.
+        """
+        position = range(len(self.events))[position]
+        if game is None:
+            game = Game(RoomFactory.get_world_by_id(self.world_id))
+        start = self.restore_points[
+            bisect.bisect_right(self.restore_points, position) - 1]
+        replay_events(game, self.events, start, position)
+        return game
+
+    def seek(self, turn, game=None):
+        """
+        Rebuilds the game as it was after a turn, counting every command
+        recorded in the journal from 1. Turn 0 is the start of the journal.
+
+        :param turn: The number of the turn.
+        :type turn: int
+        :param game: A Game to reuse instead of creating a new one. It must
+            be in the journal's world.
+        :type game: Game or None
+        :return: The game, in the state it was in after the turn.
+        :rtype: Game
+        :raises IndexError: If the journal has fewer turns.
+        """
+        if not 0 <= turn <= len(self.turns):
+            raise IndexError(f"The journal has {len(self.turns)} turns.")
+        position = self.turns[turn - 1] if turn else 0
+        return self.seek_event(position, game)
+
+
+def replay(path, position=None, game=None):
+    """
+    Rebuilds a game as it was after an event of a journal, by replaying the
+    commands typed since the last STARTED or CHECKPOINT event before it.
+
+    :param path: The journal file.
+    :type path: str
+    :param position: The index of the event to stop at. Negative indexes
+        count from the end, and None means the last event.
+    :type position: int or None
+    :param game: A Game to reuse instead of creating a new one. It must be
+        in the journal's world.
+    :type game: Game or None
+    :return: The game, in the state it was in after the event.
+    :rtype: Game
+    :raises ValueError: If the journal doesn't match its commands.
+    :raises KeyError: If the journal's world hasn't been loaded.
+    """
+    if position is None:
+        position = -1
+    return JournalReader(path).seek_event(position, game)
+
+
+def main():
+    """
+    The entry point for reading journals. Prints every event of a journal
+    and checks that its commands lead to the recorded states, or with
+    --turn prints the player's status after one turn.
+
+    :return: Nothing
+    :rtype: None
+    """
+    parser = argparse.ArgumentParser(
+        description="Print and check a session journal.")
+    parser.add_argument("journal_file")
+    parser.add_argument("--world",
+                        help="The JSON, TOML or compiled world file the "
+                             "journal was recorded in, if it isn't the "
+                             "default house.")
+    parser.add_argument("--turn", type=int,
+                        help="Print the player's status after this turn "
+                             "instead of every event.")
+    args = parser.parse_args()
+
+    if args.world:
+        RoomFactory.load_world(args.world)
+    reader = JournalReader(args.journal_file)
+    if args.turn is not None:
+        game = reader.seek(args.turn)
+        print(game.display_player_status())
+        return
+    world = RoomFactory.get_world_by_id(reader.world_id)
+    events = reader.events
+    for index, event in enumerate(events):
+        line = (f"{index}\t{KIND_NAMES[event.kind]}\t"
+                f"{world.room_names[event.room_id]}\t{event.items:#x}")
+        if event.command is not None:
+            line += f"\t{event.command}"
+        if event.outcome is not None:
+            line += f"\t{event.outcome}"
+        print(line)
+    replay_events(Game(world), events, 0, len(events) - 1)
+    print(f"{len(events)} events replayed.")
+
+
+if __name__ == '__main__':
+    main()
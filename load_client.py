@@ -0,0 +1,157 @@
+# A load generator for server.py.
+#
+# It opens many concurrent connections to the game server, plays a scripted
+# game on each one, and measures how long the server takes to answer each
+# turn. It reports the throughput and the p50/p99 turn latency.
+#
+# Usage: python load_client.py [--clients N] [--games G] [--script FILE]
+#
+
+import argparse
+import asyncio
+import time
+
+from main import WINNING_SCRIPT
+from server import COMMAND_PROMPT, REPLAY_PROMPT
+
+
+async def read_until_prompt(reader):
+    """
+    Reads the server's output until it asks for a command or asks to play
+    again.
+
+    :param reader: The stream to read from.
+    :type reader: asyncio.StreamReader
+    :return: The prompt the server sent, or None if it disconnected.
+    :rtype: str or None
+    """
+    while True:
+        line = await reader.readline()
+        if not line:
+            return None
+        line = line.decode().rstrip("\n")
+        if line in (COMMAND_PROMPT, REPLAY_PROMPT):
+            return line
+
+
+async def run_client(host, port, script, games, latencies):
+    """
+    Plays a number of games on one connection, recording the latency of
+    each turn.
+
+    :param host: The server's host.
+    :type host: str
+    :param port: The server's port.
+    :type port: int
+    :param script: The commands to send in each game.
+    :type script: list
+    :param games: How many games to play before disconnecting.
+    :type games: int
+    :param latencies: The list to append each turn's latency to, in seconds.
+    :type latencies: list
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    for game_number in range(games):
+        prompt = await read_until_prompt(reader)
+        for command in script:
+            if prompt != COMMAND_PROMPT:
+                break
+            start = time.perf_counter()
+            writer.write(command.encode() + b"\n")
+            prompt = await read_until_prompt(reader)
+            latencies.append(time.perf_counter() - start)
+        if prompt == COMMAND_PROMPT:
+            writer.write(b"q\n")
+            prompt = await read_until_prompt(reader)
+        if prompt != REPLAY_PROMPT:
+            break
+        if game_number < games - 1:
+            writer.write(b"y\n")
+    writer.write(b"n\n")
+    await writer.drain()
+    writer.close()
+
+
+def percentile(sorted_values, fraction):
+    """
+    Looks up a percentile in a sorted list using the nearest rank.
+
+    :param sorted_values: The values, sorted from lowest to highest.
+    :type sorted_values: list
+    :param fraction: The percentile as a fraction, for example 0.99.
+    :type fraction: float
+    :return: The value at that percentile.
+    :rtype: float
+    """
+    index = min(len(sorted_values) - 1,
+                max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_load(host, port, clients, games, script):
+    """
+    Runs many clients at once against the server.
+
+    :param host: The server's host.
+    :type host: str
+    :param port: The server's port.
+    :type port: int
+    :param clients: How many connections to open at once.
+    :type clients: int
+    :param games: How many games each client plays.
+    :type games: int
+    :param script: The commands to send in each game.
+    :type script: list
+    :return: A dictionary with the number of turns, the elapsed time, and
+        the turns per second, p50 and p99 latency.
+    :rtype: dict
+    """
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(host, port, script, games, latencies)
+                           for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "turns": len(latencies),
+        "elapsed": elapsed,
+        "turns_per_second": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.50) if latencies else 0.0,
+        "p99": percentile(latencies, 0.99) if latencies else 0.0,
+    }
+
+
+def main():
+    """
+    The entry point for the load generator. Parses the command line options,
+    runs the load, and prints the results.
+
+    :return: Nothing
+    :rtype: None
+    """
+    parser = argparse.ArgumentParser(
+        description="Measure the turn latency of the game server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8023)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--games", type=int, default=1)
+    parser.add_argument("--script",
+                        help="A file with one command per line to send in "
+                             "each game instead of the winning game.")
+    args = parser.parse_args()
+
+    script = WINNING_SCRIPT
+    if args.script:
+        with open(args.script) as script_file:
+            script = [line.rstrip("\r\n") for line in script_file]
+
+    results = asyncio.run(run_load(args.host, args.port, args.clients,
+                                   args.games, script))
+    print(f"{results['turns']} turns in {results['elapsed']:.2f}s "
+          f"({results['turns_per_second']:.0f} turns/s)")
+    print(f"p50 {results['p50'] * 1000:.2f}ms, "
+          f"p99 {results['p99'] * 1000:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
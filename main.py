@@ -20,15 +20,36 @@
 #   https://realpython.com/factory-method-python/
 #
 
+import argparse
+import hashlib
+import json
+import tomllib
+from array import array
+from collections import namedtuple
+from collections.abc import Mapping, Sequence
+from types import MappingProxyType
+
+
 class Player:
     """
-    A class to represent a player.
+    A class to represent a player. The player's state is kept as two
+    integers, the id of the room they are in and a bitmask of the items they
+    picked up, so it is cheap to copy, compare and hash.
 
     Attributes:
+        world (World): The layout of the house the player is in.
+        rooms (RoomMap): The game's Rooms.
+        room_id (int): The id of the room the player is currently in.
+        items (int): A bitmask with one bit set for each item the player
+            picked up.
         current_room (Room object): The room the player is currently in.
-        inventory (list): Holds the items the player picks up.
+        inventory (list): The names of the items the player picked up, in
+            the order they picked them up.
 
     Methods:
+        get_state(): Returns the player's state as a pair of integers.
+        set_state(state): Moves the player to a room and sets their items
+            from a pair of integers returned by get_state.
         get_player_status(): Describes the status of the player: the room they
             are in, and their inventory.
         get_item(item): Checks if the item the player wants to pick up is in
@@ -36,15 +57,87 @@ class Player:
             room, and returns a string confirming this. If it isn't, returns a
             string to inform the player.
     """
-    def __init__(self, first_room):
+    def __init__(self, first_room, rooms, world):
         """
         Constructs the player object.
 
         :param first_room: The room the player is in when the game starts.
         :type first_room: Room
+        :param rooms: The game's Rooms.
+        :type rooms: RoomMap
+        :param world: The layout of the house the player is in.
+        :type world: World
+        """
+        self.world = world
+        self.rooms = rooms
+        self.room_id = first_room.template.room_id
+        self.items = 0
+        # The bits of the picked up items, in the order they were picked up.
+        # It isn't part of the state, only of how the inventory is listed.
+        self._pickup_order = []
+
+    @property
+    def current_room(self):
         """
-        self.current_room = first_room
-        self.inventory = []
+        The room the player is currently in.
+
+        :rtype: Room
+        """
+        return self.rooms.get_by_id(self.room_id)
+
+    @current_room.setter
+    def current_room(self, room):
+        self.room_id = room.template.room_id
+
+    @property
+    def inventory(self):
+        """
+        The names of the items the player picked up, in the order they
+        picked them up. Items given by set_state are listed after those, in
+        the order they appear in the house.
+
+        :rtype: list
+        """
+        picked = 0
+        names = []
+        item_names = self.world.item_names
+        for item_bit in self._pickup_order:
+            picked |= item_bit
+            names.append(item_names[item_bit.bit_length() - 1])
+        names += self.world.get_item_names(self.items & ~picked)
+        return names
+
+    def get_state(self):
+        """
+        Returns the player's state as a pair of integers.
+
+        :return: A tuple with the id of the player's room and the bitmask of
+            their items.
+        :rtype: tuple
+        """
+        return self.room_id, self.items
+
+    def set_state(self, state):
+        """
+        Moves the player to a room and sets their items from a pair of
+        integers returned by get_state. It doesn't change the rooms; use
+        Game.set_state to restore the whole game.
+
+        :param state: A tuple with a room id and an item bitmask.
+        :type state: tuple
+        """
+        self.room_id, self.items = state
+        if self._pickup_order:
+            self._pickup_order = [item_bit for item_bit in self._pickup_order
+                                  if item_bit & self.items]
+
+    def __reduce__(self):
+        """
+        Pickles the player as their world id and state. Unpickling gives the
+        player of a new Game in that state.
+        """
+        return _restore_player, (self.world.world_id, self.room_id,
+                                 self.items)
 
     def get_player_status(self):
         """
@@ -55,8 +148,8 @@ class Player:
             currently in and the items in their inventory.
         :rtype: str
         """
-        room = self.current_room.name
-        if len(self.inventory) > 0:
+        room = self.world.room_names[self.room_id]
+        if self.items:
             inventory = ", ".join(self.inventory)
         else:
             inventory = "not picked up any items yet"
@@ -76,25 +169,87 @@ class Player:
             the item is not in the room.
         :rtype: str
         """
-        if self.current_room.has_item() and \
-                self.current_room.item["item_name"] == item:
-            self.inventory.append(item)
-            self.current_room.remove_item()
+        current_room = self.current_room
+        if current_room.has_item() and \
+                current_room.item["item_name"] == item:
+            self.items |= current_room.template.item_bit
+            self._pickup_order.append(current_room.template.item_bit)
+            current_room.remove_item()
             return f"You picked up a {item}."
         else:
             return "Can't get that item."
 
 
+class RoomTemplate(namedtuple("RoomTemplate", ["name", "item", "exits",
+                                               "room_id", "item_bit",
+                                               "world_id"])):
+    """
+    A class to represent the parts of a room that never change during a
+    game. One template is shared by the rooms of every Game, so the names,
+    items and exits are only stored once no matter how many games are
+    running.
+
+    Attributes:
+        name (str): The name of the room.
+        item (mappingproxy or None): A read-only dictionary that holds the
+            name of the item in the room and how it can be used or None if the
+            room has no item.
+        exits (mappingproxy): A read-only dictionary that holds cardinal
+            directions and the rooms attached to that room through those
+            directions
+        room_id (int): The room's position in its World.
+        item_bit (int): The bit that represents the room's item in a
+            player's item bitmask, or 0 if the room has no item.
+        world_id (str): The world_id of the World the room is in.
+    """
+    __slots__ = ()
+
+    def __reduce__(self):
+        """
+        Pickles the template as its world id and room id, so it is read
+        back from the loaded World instead of copying its dictionaries.
+        """
+        return _restore_template, (self.world_id, self.room_id)
+
+    @classmethod
+    def from_config(cls, config, room_id=0, item_bit=0,
+                    world_id="default"):
+        """
+        Creates a RoomTemplate from a room's entry in rooms_config, copying
+        the item and exits dictionaries so changes to the config can't leak
+        into games.
+
+        :param config: A dictionary with the name, item and exits of a room.
+            The item can be left out if the room has no item.
+        :type config: dict
+        :param room_id: The room's position in its World.
+        :type room_id: int
+        :param item_bit: The bit that represents the room's item, or 0 if the
+            room has no item.
+        :type item_bit: int
+        :param world_id: The world_id of the World the room is in.
+        :type world_id: str
+        :return: A RoomTemplate object
+        :rtype: RoomTemplate
+        """
+        item = config.get("item")
+        if item is not None:
+            item = MappingProxyType(dict(item))
+        exits = MappingProxyType(dict(config["exits"]))
+        return cls(config["name"], item, exits, room_id, item_bit, world_id)
+
+
 class Room:
     """
     A class to represent a room of the player's house
 
     Attributes:
+        template (RoomTemplate): The shared name, item and exits of the room.
         name (str): The name of the room.
-        item (dict or None): A dictionary in the Room object that holds the
+        item (mappingproxy or None): A read-only dictionary that holds the
             name of the item in the room and how it can be used or None if the
-            room has no item.
-        exits (dict): A dictionary in the Room object that holds cardinal
+            room has no item or the player picked it up.
+        exits (mappingproxy): A read-only dictionary that holds cardinal
             directions and the rooms attached to that room through those
             directions
 
@@ -105,24 +260,37 @@ class Room:
         remove_item(): Sets an item in the room to None, to represent it being
             removed from the room after the player picks it up.
     """
-    def __init__(self, name, item_dict, exits_dict):
+    __slots__ = ("template", "item")
+
+    def __init__(self, template):
         """
-        Constructs the Room object
+        Constructs the Room object. Only the item belongs to the room; the
+        name and exits are read from the shared template.
 
-        :param name: The name of the room.
-        :type name: str
-        :param item_dict: A dictionary in the Room object that holds the
-            name of the item in the room and how it can be used or None if the
-            room has no item.
-        :type item_dict: dict
-        :param exits_dict: A dictionary in the Room object that holds cardinal
-            directions and the rooms attached to that room through those
-            directions
-        :type exits_dict: dict
+        :param template: The shared name, item and exits of the room.
+        :type template: RoomTemplate
+        """
+        self.template = template
+        self.item = template.item
+
+    @property
+    def name(self):
+        """
+        The name of the room.
+
+        :rtype: str
+        """
+        return self.template.name
+
+    @property
+    def exits(self):
+        """
+        The cardinal directions and the rooms attached to that room through
+        those directions.
+
+        :rtype: mappingproxy
         """
-        self.name = name
-        self.item = item_dict
-        self.exits = exits_dict
+        return self.template.exits
 
     def has_item(self):
         """
@@ -159,29 +327,770 @@ class Room:
         """
         self.item = None
 
+    def __reduce__(self):
+        """
+        Pickles the room as its world id, room id and whether its item is
+        still there.
+        """
+        template = self.template
+        return _restore_room, (template.world_id, template.room_id,
+                               self.item is not None)
+
+
+class WorldReport:
+    """
+    A class to hold the problems found in a world when it is loaded.
+
+    Attributes:
+        errors (list): Problems that stop the game from being played or won,
+            like exits to rooms that don't exist or items that can't be
+            reached.
+        warnings (list): Things that are allowed but probably mistakes, like
+            exits that don't lead back the way they came or rooms that can't
+            be reached.
+
+    Methods:
+        is_valid(): Checks if the world has no errors.
+    """
+    def __init__(self, errors=None, warnings=None):
+        """
+        Constructs the WorldReport object.
+
+        :param errors: The errors found in the world.
+        :type errors: list or None
+        :param warnings: The warnings found in the world.
+        :type warnings: list or None
+        """
+        self.errors = errors if errors is not None else []
+        self.warnings = warnings if warnings is not None else []
+
+    def is_valid(self):
+        """
+        Checks if the world has no errors.
+
+        :return: True or false
+        :rtype: bool
+        """
+        return not self.errors
+
+
+class TemplateCache(Sequence):
+    """
+    A class to build the RoomTemplates of a World the first time each one
+    is asked for, so a world with many rooms only holds templates for the
+    rooms games have entered.
+    """
+    def __init__(self, world):
+        """
+        Constructs the TemplateCache object.
+
+        :param world: The world the rooms are in.
+        :type world: World
+        """
+        self.world = world
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.world.room_names)
+
+    def __getitem__(self, room_id):
+        if isinstance(room_id, slice):
+            return [self[i] for i in range(*room_id.indices(len(self)))]
+        if room_id < 0:
+            room_id += len(self)
+        template = self.cache.get(room_id)
+        if template is None:
+            template = self.world.build_template(room_id)
+            self.cache[room_id] = template
+        return template
+
+
+class ExitAdjacency(Sequence):
+    """
+    A class to read the moves out of each room of a World from its exit
+    columns, as (direction, room id) pairs.
+    """
+    def __init__(self, world):
+        """
+        Constructs the ExitAdjacency object.
+
+        :param world: The world the rooms are in.
+        :type world: World
+        """
+        self.world = world
+
+    def __len__(self):
+        return len(self.world.room_names)
+
+    def __getitem__(self, room_id):
+        if isinstance(room_id, slice):
+            return [self[i] for i in range(*room_id.indices(len(self)))]
+        return tuple((direction, column[room_id])
+                     for direction, column in zip(self.world.DIRECTIONS,
+                                                  self.world.exits)
+                     if column[room_id] != -1)
+
+
+class World:
+    """
+    A class to represent the layout of a house. It gives every room an
+    integer id and every item a bit, so the state of a game can be stored as
+    a room id and an item bitmask. A World never changes once it is created
+    and is shared by every game played in that house.
+
+    Attributes:
+        world_id (str): A name that identifies the world, like the hash of
+            the file it was loaded from.
+        room_names (tuple): The names of the rooms. A room's id is its
+            position in this tuple.
+        room_ids (dict): The id of each room, keyed by room name.
+        exits (tuple): One array per direction in DIRECTIONS with the id of
+            the room in that direction from each room, or -1 if there is no
+            room in that direction. Exits in other directions are left out,
+            because the player can't type them.
+        templates (TemplateCache): The RoomTemplate of each room, by room
+            id, built from the tables the first time it is needed.
+        item_names (tuple): The names of the items. An item's bit is 1
+            shifted left by its position in this tuple.
+        item_uses (tuple): What each item can be used for, in the same
+            order as item_names.
+        item_rooms (tuple): The id of the room each item is in, in the same
+            order as item_names.
+        item_room_ids (dict): The id of the room each item is in, keyed by
+            item name.
+        item_bits (list): The bit of each room's item in a player's item
+            bitmask, by room id, or 0 if the room has no item.
+        adjacency (ExitAdjacency): The moves the player can make out of
+            each room as (direction, room id) pairs, by room id, read from
+            the exit columns.
+        total_items (int): The total number of the items in the house.
+        all_items (int): The item bitmask with every item picked up.
+        start_room (int): The id of the room the player starts in.
+        villain_room (int): The id of the room el Chupacabras is in.
+        report (WorldReport): The problems found in the world when it was
+            created.
+
+    Methods:
+        analyze(): Checks that the rooms and items can be reached and that
+            exits lead back the way they came.
+        build_template(room_id): Builds the RoomTemplate of a room.
+        get_policy(): Returns the table of the best command to type in every
+            state, for hints.
+        get_item_names(items): Returns the names of the items in a bitmask.
+    """
+    DIRECTIONS = ("north", "south", "east", "west")
+    # The position of each direction's column in exits.
+    DIRECTION_COLUMNS = {direction: column
+                         for column, direction in enumerate(DIRECTIONS)}
+    # The action code of the "get" command, for solvers, simulations and
+    # batches that play action codes instead of commands. Codes 0 to 3 are
+    # the moves in DIRECTIONS.
+    GET = len(DIRECTIONS)
+    OPPOSITE_DIRECTIONS = {"north": "south", "south": "north",
+                           "east": "west", "west": "east"}
+    # The policy table for hints, loaded by get_policy the first time a hint
+    # is asked for. It is False if the world is too big for a table.
+    _policy = None
+
+    def __init__(self, config, start_room="bedroom",
+                 villain_room="backyard", world_id="default"):
+        """
+        Constructs the World object from a dictionary shaped like
+        rooms_config. The exits, the items' names and uses and the names
+        shown for the rooms are copied into the world's tables, and the
+        config isn't kept: RoomTemplates are built from the tables the
+        first time they are needed, the way MappedWorld builds them from a
+        compiled file.
+
+        :param config: A dictionary of rooms keyed by room name. Each value is
+            a dictionary with the name, item and exits of the room.
+        :type config: dict
+        :param start_room: The name of the room the player starts in.
+        :type start_room: str
+        :param villain_room: The name of the room el Chupacabras is in.
+        :type villain_room: str
+        :param world_id: A name that identifies the world.
+        :type world_id: str
+        :raises ValueError: If an exit, the start room or the villain room
+            names a room that doesn't exist.
+        """
+        self.world_id = world_id
+        self.room_names = tuple(config)
+        self.room_ids = {name: room_id
+                         for room_id, name in enumerate(self.room_names)}
+
+        room_count = len(self.room_names)
+        self.exits = tuple(array("i", [-1]) * room_count
+                           for _ in self.DIRECTIONS)
+        item_names = []
+        item_uses = []
+        item_rooms = []
+        self.item_bits = [0] * room_count
+        # The names shown for the rooms whose name isn't their key, and the
+        # exits in directions the player can't type, by room id. Both are
+        # rare, so they are kept apart from the tables every room has.
+        self._display_names = {}
+        self._unusable_exits = {}
+        missing_rooms = []
+        for room_id, name in enumerate(self.room_names):
+            room_config = config[name]
+            if room_config["name"] != name:
+                self._display_names[room_id] = room_config["name"]
+            if room_config.get("item") is not None:
+                self.item_bits[room_id] = 1 << len(item_names)
+                item_names.append(room_config["item"]["item_name"])
+                item_uses.append(room_config["item"]["item_use"])
+                item_rooms.append(room_id)
+            for direction, room_name in room_config["exits"].items():
+                next_room = self.room_ids.get(room_name)
+                if next_room is None:
+                    missing_rooms.append(
+                        f"The {direction} exit of the {room_config['name']} "
+                        f"leads to the {room_name}, which doesn't exist.")
+                elif direction in self.DIRECTION_COLUMNS:
+                    column = self.exits[self.DIRECTION_COLUMNS[direction]]
+                    column[room_id] = next_room
+                else:
+                    self._unusable_exits.setdefault(
+                        room_id, {})[direction] = room_name
+        self.templates = TemplateCache(self)
+        self.item_names = tuple(item_names)
+        self.item_uses = tuple(item_uses)
+        self.item_rooms = tuple(item_rooms)
+        self.item_room_ids = dict(zip(item_names, item_rooms))
+        self.adjacency = ExitAdjacency(self)
+        for role, room_name in (("start", start_room),
+                                ("villain", villain_room)):
+            if room_name not in self.room_ids:
+                missing_rooms.append(f"The {role} room, the {room_name}, "
+                                     f"doesn't exist.")
+        if missing_rooms:
+            raise ValueError(" ".join(missing_rooms))
+
+        self.total_items = len(self.item_names)
+        self.all_items = (1 << self.total_items) - 1
+        self.start_room = self.room_ids[start_room]
+        self.villain_room = self.room_ids[villain_room]
+        self.report = self.analyze()
+
+    def analyze(self):
+        """
+        Checks that the game can be won: the villain room and every room
+        with an item can be reached, no two items share a name, and there
+        is an order to pick the items up in that still leads to the villain
+        room. Exits can be one-way, so the rooms are grouped into strongly
+        connected components, the groups of rooms that all lead to each
+        other, and the groups that hold items must lie on one path that
+        ends in the villain room.
+
+        It also warns about rooms that can't be reached and exits that don't
+        lead back the way they came: if the kitchen's west exit leads to the
+        living room, the living room's east exit should lead to the kitchen.
+
+        The game ends in the villain room, so it is never walked through when
+        finding the rooms the player can reach.
+
+        :return: The errors and warnings found.
+        :rtype: WorldReport
+        """
+        report = WorldReport()
+        room_names = self.room_names
+
+        for room_id, unusable_exits in self._unusable_exits.items():
+            room_name = self._display_names.get(room_id, room_names[room_id])
+            for direction in unusable_exits:
+                report.warnings.append(
+                    f"The {direction} exit of the {room_name} can't be "
+                    f"used, because the player can only go north, south, "
+                    f"east or west.")
+
+        exits = self.exits
+        for direction, column in zip(self.DIRECTIONS, exits):
+            opposite = self.OPPOSITE_DIRECTIONS[direction]
+            back_column = exits[self.DIRECTION_COLUMNS[opposite]]
+            for room_id, next_room in enumerate(column):
+                if next_room != -1 and back_column[next_room] != room_id:
+                    report.warnings.append(
+                        f"The {direction} exit of the {room_names[room_id]} "
+                        f"leads to the {room_names[next_room]}, but its "
+                        f"{opposite} exit doesn't lead back.")
+
+        reachable = self._get_reachable_rooms(self.start_room)
+
+        # The rooms the villain room can be reached from, found by walking
+        # the exits backward from it.
+        entrances = {}
+        for column in exits:
+            for room_id, next_room in enumerate(column):
+                if next_room != -1 and room_id != self.villain_room:
+                    entrances.setdefault(next_room, []).append(room_id)
+        leads_to_villain = {self.villain_room}
+        to_visit = [self.villain_room]
+        while to_visit:
+            room_id = to_visit.pop()
+            for previous_room in entrances.get(room_id, ()):
+                if previous_room not in leads_to_villain:
+                    leads_to_villain.add(previous_room)
+                    to_visit.append(previous_room)
+
+        if self.villain_room not in reachable:
+            report.errors.append(f"The villain room, the "
+                                 f"{room_names[self.villain_room]}, can't be "
+                                 f"reached.")
+        first_rooms = {}
+        item_errors = len(report.errors)
+        for item_name, room_id in zip(self.item_names, self.item_rooms):
+            first_room = first_rooms.setdefault(item_name, room_id)
+            if first_room != room_id:
+                report.errors.append(f"The {item_name} in the "
+                                     f"{room_names[room_id]} has the same "
+                                     f"name as the one in the "
+                                     f"{room_names[first_room]}.")
+            if room_id == self.villain_room or room_id not in reachable:
+                report.errors.append(f"The {item_name} in the "
+                                     f"{room_names[room_id]} can't be picked "
+                                     f"up before meeting el Chupacabras.")
+            elif room_id not in leads_to_villain:
+                report.errors.append(f"The villain room can't be reached "
+                                     f"after picking up the {item_name} in "
+                                     f"the {room_names[room_id]}.")
+
+        if len(report.errors) == item_errors and self.item_rooms:
+            components = self._find_components(
+                reachable - {self.villain_room})
+            item_components = {}
+            for item_name, room_id in zip(self.item_names, self.item_rooms):
+                item_components.setdefault(components[room_id],
+                                           (item_name, room_id))
+            # Components are numbered so exits only lead to lower numbers,
+            # so the player meets the item components in decreasing order.
+            chain = [item_components[component]
+                     for component in sorted(item_components, reverse=True)]
+            for (item_name, room_id), (next_name, next_room) in zip(
+                    chain, chain[1:]):
+                if next_room not in self._get_reachable_rooms(room_id):
+                    report.errors.append(
+                        f"The {item_name} in the {room_names[room_id]} and "
+                        f"the {next_name} in the {room_names[next_room]} "
+                        f"can't both be picked up, because neither room "
+                        f"leads to the other.")
+                    break
+
+        for room_id, room_name in enumerate(room_names):
+            if room_id not in reachable:
+                report.warnings.append(f"The {room_name} can't be reached.")
+        return report
+
+    def _get_reachable_rooms(self, first_room):
+        """
+        Finds the rooms the player can walk to from a room, without walking
+        through the villain room.
+
+        :param first_room: The id of the room to start from.
+        :type first_room: int
+        :return: The ids of the rooms that can be reached, including
+            first_room and the villain room if it can be reached.
+        :rtype: set
+        """
+        reachable = {first_room}
+        to_visit = [first_room]
+        while to_visit:
+            room_id = to_visit.pop()
+            if room_id == self.villain_room:
+                continue
+            for column in self.exits:
+                next_room = column[room_id]
+                if next_room != -1 and next_room not in reachable:
+                    reachable.add(next_room)
+                    to_visit.append(next_room)
+        return reachable
+
+    def _find_components(self, rooms):
+        """
+        Finds the strongly connected components of some rooms, the groups
+        of rooms that can all be walked to from each other, with an
+        iterative version of Tarjan's algorithm. Exits to rooms outside the
+        set are ignored.
+
+        :param rooms: The ids of the rooms.
+        :type rooms: set
+        :return: The number of each room's component, keyed by room id.
+            Exits only lead from a component to itself or to components
+            with lower numbers.
+        :rtype: dict
+        """
+        exits = self.exits
+        order = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        components = {}
+        component_count = 0
+        for root in rooms:
+            if root in order:
+                continue
+            # Each entry is a room and the exit column to look at next.
+            work = [(root, 0)]
+            while work:
+                room_id, column = work.pop()
+                if column == 0:
+                    low[room_id] = order[room_id] = len(order)
+                    stack.append(room_id)
+                    on_stack.add(room_id)
+                descended = False
+                while column < len(exits):
+                    next_room = exits[column][room_id]
+                    column += 1
+                    if next_room not in rooms:
+                        continue
+                    if next_room not in order:
+                        work.append((room_id, column))
+                        work.append((next_room, 0))
+                        descended = True
+                        break
+                    if next_room in on_stack:
+                        low[room_id] = min(low[room_id], order[next_room])
+                if descended:
+                    continue
+                if low[room_id] == order[room_id]:
+                    while True:
+                        other_room = stack.pop()
+                        on_stack.discard(other_room)
+                        components[other_room] = component_count
+                        if other_room == room_id:
+                            break
+                    component_count += 1
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[room_id])
+        return components
+
+    def build_template(self, room_id):
+        """
+        Builds the RoomTemplate of a room from the world's tables.
+
+        :param room_id: The room's id.
+        :type room_id: int
+        :rtype: RoomTemplate
+        """
+        exits = {}
+        for direction, column in zip(self.DIRECTIONS, self.exits):
+            next_room = column[room_id]
+            if next_room != -1:
+                exits[direction] = self.room_names[next_room]
+        exits.update(self._unusable_exits.get(room_id, ()))
+        item = None
+        item_bit = self.item_bits[room_id]
+        if item_bit:
+            index = item_bit.bit_length() - 1
+            item = MappingProxyType({"item_name": self.item_names[index],
+                                     "item_use": self.item_uses[index]})
+        name = self._display_names.get(room_id, self.room_names[room_id])
+        return RoomTemplate(name, item, MappingProxyType(exits), room_id,
+                            item_bit, self.world_id)
+
+    def get_policy(self):
+        """
+        Returns the table of the best command to type in every state, built
+        by solver.load_policy. It is loaded from the disk cache, or built and
+        saved to it, the first time it is asked for. Worlds with too many
+        states for a table, as checked by solver.policy_fits, have none.
+
+        :return: The action code for each state, indexed by
+            items * room_count + room_id, or None if the world is too big.
+        :rtype: bytes or bytearray or None
+        """
+        if self._policy is None:
+            from solver import load_policy, policy_fits
+
+            self._policy = load_policy(self) if policy_fits(self) else False
+        return self._policy or None
+
+    def __reduce__(self):
+        """
+        Pickles the world as its world_id. It is unpickled with
+        RoomFactory.get_world_by_id, so it must be loaded in the process
+        that unpickles it.
+        """
+        return RoomFactory.get_world_by_id, (self.world_id,)
+
+    def get_item_names(self, items):
+        """
+        Returns the names of the items in a bitmask, in the order the items
+        appear in the house.
+
+        :param items: An item bitmask.
+        :type items: int
+        :return: A list of item names.
+        :rtype: list
+        """
+        names = []
+        index = 0
+        while items:
+            if items & 1:
+                names.append(self.item_names[index])
+            items >>= 1
+            index += 1
+        return names
+
 
 class RoomFactory:
     """
     A class to implement the factory pattern to create rooms.
 
+    World definition files are JSON or TOML files with the name of the room
+    the player starts in, the name of the room el Chupacabras is in, and the
+    rooms in the same shape as rooms_config:
+
+        {"start_room": "bedroom", "villain_room": "backyard",
+         "rooms": {"bedroom": {"name": "bedroom", "item": null,
+                               "exits": {"north": "living room"}}, ...}}
+
+    Each file is parsed once. Its World is cached by the hash of the file's
+    contents, so games started in a world that is already loaded don't parse
+    anything.
+
     Methods:
-        create_room(room_name): Creates an instance of a Room object using
-        data from the rooms_config dictionary
+        get_world(): Returns the shared World built from the rooms_config
+        dictionary, creating it the first time
+        load_world(path): Returns the World defined in a JSON or TOML file,
+        parsing the file only if its contents haven't been loaded before, or
+        maps a compiled world file
+        get_world_by_id(world_id): Returns a World that is already loaded
+        from its world_id
+        get_template(room_name, world): Returns the shared RoomTemplate for a
+        room
+        create_room(room_name, world): Creates an instance of a Room object
+        using data from the rooms_config dictionary or a loaded world
+        create_room_by_id(room_id, world): Creates an instance of a Room
+        object from its id in a world
     """
+    _worlds = {}
+
+    @staticmethod
+    def get_world():
+        """
+        Returns the shared World built from the rooms_config dictionary,
+        creating it the first time it is needed.
+
+        :return: The World of the house
+        :rtype: World
+        """
+        world = RoomFactory._worlds.get("default")
+        if world is None:
+            world = World(rooms_config)
+            RoomFactory._worlds["default"] = world
+        return world
+
     @staticmethod
-    def create_room(room_name):
+    def load_world(path):
+        """
+        Returns the World defined in a JSON or TOML file. The file is read
+        and hashed every time, but it is only parsed if no World with the
+        same contents has been loaded before.
+
+        Files made by compiled_world.compile_world are mapped instead of
+        read, and are cached by the world id stored in them. Only their
+        header is read if a World with that id has been loaded before.
+
+        :param path: The path of a .json or .toml world definition file, or
+            of a compiled world file.
+        :type path: str
+        :return: The World defined in the file. Its world_id is the SHA-256
+            hash of the file's contents.
+        :rtype: World
+        :raises ValueError: If the world can't be played, for example
+            because an item can't be reached.
+        """
+        from compiled_world import HEADER, MAGIC, MappedWorld, read_world_id
+
+        with open(path, "rb") as world_file:
+            data = world_file.read(HEADER.size)
+            compiled = data.startswith(MAGIC)
+            if not compiled:
+                data += world_file.read()
+        if compiled:
+            world = RoomFactory._worlds.get(read_world_id(data, path))
+            if world is not None:
+                return world
+            world = MappedWorld(path)
+        else:
+            world_id = hashlib.sha256(data).hexdigest()
+            world = RoomFactory._worlds.get(world_id)
+            if world is not None:
+                return world
+            if str(path).endswith(".toml"):
+                definition = tomllib.loads(data.decode())
+            else:
+                definition = json.loads(data)
+            world = World(definition["rooms"], definition["start_room"],
+                          definition["villain_room"], world_id)
+
+        if not world.report.is_valid():
+            if compiled:
+                world.close()
+            raise ValueError(f"{path} can't be played: "
+                             + " ".join(world.report.errors))
+        return RoomFactory._worlds.setdefault(world.world_id, world)
+
+    @staticmethod
+    def get_world_by_id(world_id):
+        """
+        Returns a World that is already loaded from its world_id, for
+        rebuilding games that were saved with only the id of their world.
+        The default house is created if it is asked for.
+
+        :param world_id: The world_id of the World.
+        :type world_id: str
+        :return: The World with that id
+        :rtype: World
+        :raises KeyError: If no World with that id has been loaded.
+        """
+        if world_id == "default":
+            return RoomFactory.get_world()
+        world = RoomFactory._worlds.get(world_id)
+        if world is None:
+            raise KeyError(f"The world {world_id} hasn't been loaded. Load "
+                           f"it with RoomFactory.load_world first.")
+        return world
+
+    @staticmethod
+    def get_template(room_name, world=None):
+        """
+        Returns the shared RoomTemplate for a room.
+
+        :param room_name: The name of the room to look up
+        :type room_name: str
+        :param world: The world the room is in. The house in rooms_config is
+            used if it isn't given.
+        :type world: World or None
+        :return: The room's RoomTemplate object
+        :rtype: RoomTemplate
+        """
+        if world is None:
+            world = RoomFactory.get_world()
+        return world.templates[world.room_ids[room_name]]
+
+    @staticmethod
+    def create_room(room_name, world=None):
         """
         Creates an instance of a Room object using data from the rooms_config
-        dictionary
+        dictionary or a loaded world. Rooms created for the same name share
+        one RoomTemplate.
 
-        :param room_name: The name of the room to look up in the rooms_config
-            dictionary
+        :param room_name: The name of the room to look up
         :type room_name: str
+        :param world: The world the room is in. The house in rooms_config is
+            used if it isn't given.
+        :type world: World or None
+        :return: A Room object
+        :rtype: Room
+        """
+        return Room(RoomFactory.get_template(room_name, world))
+
+    @staticmethod
+    def create_room_by_id(room_id, world):
+        """
+        Creates an instance of a Room object from its id in a world, without
+        looking up its name.
+
+        :param room_id: The id of the room in the world
+        :type room_id: int
+        :param world: The world the room is in.
+        :type world: World
         :return: A Room object
         :rtype: Room
         """
-        config = rooms_config.get(room_name)
-        return Room(config["name"], config["item"], config["exits"])
+        return Room(world.templates[room_id])
+
+
+class RoomMap(Mapping):
+    """
+    A class to hold the Rooms of a game. It works like a dictionary of Rooms
+    keyed by room name, but each Room is only created the first time it is
+    looked up, so starting a game takes the same time no matter how big the
+    world is. A new Room has its item unless the player already picked it
+    up.
+
+    Only the Rooms with an item are kept, since their item is the only part
+    of a room that changes during a game. A Room without an item is kept
+    until another one is looked up, so a game holds at most one Room per
+    item and one more however far the player walks.
+
+    Attributes:
+        world (World): The layout of the house.
+        player (Player or None): The player whose items decide which rooms
+            still have their item.
+        created (dict): The Rooms with an item created so far, keyed by
+            room id.
+
+    Methods:
+        get_by_id(room_id): Returns the Room with an id, creating it if
+            needed.
+        set_items(items): Puts back or removes the items of the Rooms
+            created so far to match a player's item bitmask.
+    """
+    def __init__(self, world):
+        """
+        Constructs an empty RoomMap object.
+
+        :param world: The layout of the house.
+        :type world: World
+        """
+        self.world = world
+        self.player = None
+        self.created = {}
+        self._last_room = None
+
+    def __getitem__(self, room_name):
+        return self.get_by_id(self.world.room_ids[room_name])
+
+    def __iter__(self):
+        return iter(self.world.room_names)
+
+    def __len__(self):
+        return len(self.world.room_names)
+
+    def get_by_id(self, room_id):
+        """
+        Returns the Room with an id, creating it if needed.
+
+        :param room_id: The id of the room.
+        :type room_id: int
+        :return: The game's Room object for that id.
+        :rtype: Room
+        """
+        room = self.created.get(room_id)
+        if room is not None:
+            return room
+        if not self.world.item_bits[room_id]:
+            room = self._last_room
+            if room is None or room.template.room_id != room_id:
+                room = RoomFactory.create_room_by_id(room_id, self.world)
+                self._last_room = room
+            return room
+        room = RoomFactory.create_room_by_id(room_id, self.world)
+        if self.player is not None and \
+                room.template.item_bit & self.player.items:
+            room.remove_item()
+        self.created[room_id] = room
+        return room
+
+    def set_items(self, items):
+        """
+        Puts back or removes the items of the Rooms created so far to match
+        a player's item bitmask. Only Rooms with an item are kept, so it
+        takes at most one step per item. Rooms that haven't been created yet
+        get the right item when they are.
+
+        :param items: The player's item bitmask.
+        :type items: int
+        """
+        for room in self.created.values():
+            if room.template.item_bit & items:
+                room.item = None
+            else:
+                room.item = room.template.item
 
 
 class Game:
@@ -189,14 +1098,30 @@ class Game:
     A class to represent and handle the flow of the game.
 
     Attributes:
-        rooms (dict): A dictionary of all Rooms
+        world (World): The layout of the house, shared by every game.
+        rooms (RoomMap): A dictionary of all Rooms, created as they are
+            needed
         player (Player): The player
         total_items (int): The total number of the items in the house. The
             player must pick up all items to win. This variable is used to
             compare against the number of items the player has in their
             inventory.
+        game_info (str): The story told in the opening message, with the
+            number of items in the house.
+        listeners (list): Functions called after every command and every
+            change of state made with set_state, for journals and session
+            stores. Each is called with the game, the command typed (or None
+            for set_state) and the state before the change.
 
     Methods:
+        add_listener(listener): Calls a function after every command and
+            state change.
+        remove_listener(listener): Stops calling a listener.
+        get_state(): Returns a snapshot of the game as a pair of integers:
+            the player's room id and the bitmask of their items.
+        set_state(state): Restores the game to a snapshot returned by
+            get_state.
+        reset(): Puts the game back to how it was when it was created.
         display_opening_message(): Returns a list of messages to welcome the
             player to the game, give the story and context, and explain
             how to play.
@@ -210,29 +1135,44 @@ class Game:
             to it in that direction. If it does, it updates the player's
             current_room to the room in that direction to represent the player
             moving to a different room.
+        give_hint(): Returns the best command to type next, from the world's
+            policy table.
         process_command(user_input): Takes the user input, sanitizes it, then
-            calls the appropriate function to handle their command.
+            calls the appropriate function to handle their command and the
+            game's listeners.
         player_outcome(): Checks if the player has reached the room that
             the Chupacabras is in and whether they have the right number of
             items needed to win the game.
-        play(): This method controls the flow of the game by calling methods
-            in a while loop until the game is finished. It prints the opening
-            messages, player status and room status. It takes the user input,
-            checking if it is "q" for quitting the game. It calls the
-            process_command method, printing the results followed by a text
-            divider for ease of reading. It prints the winning or losing
+        play_session(): A generator version of the game loop. It calls
+            methods in a while loop until the game is finished, yielding the
+            opening messages, player status and room status and receiving
+            the user input, checking if it is "q" for quitting the game. It
+            calls the process_command method, rendering the results followed
+            by a text divider for ease of reading, and the winning or losing
             message before ending the game.
+        play(): This method controls the flow of the game in the terminal by
+            printing the output of play_session and sending it the user
+            input until the game is finished.
+        run_commands(commands): Plays the game headlessly from an iterable
+            of commands instead of input(), collecting the output play()
+            would print. Returns the output and the player's outcome.
     """
     TEXT_DIVIDER = "-" * 30
     WELCOME_MESSAGE = "A Visit from El Chupacabras!"
     GAME_INFO = (
         "El chupacabras has come to suck the blood of your livestock! Move "
-        "throughout your house and collect 6 items before coming face to "
-        "face with the beast!")
+        "throughout your house and collect {total_items} items before coming "
+        "face to face with the beast!")
     MOVING_INSTRUCTIONS = "To move to a different room type 'go south, " \
                           "'go north', 'go east', or 'go west'."
     ITEM_INSTRUCTIONS = "To add an item to your inventory, type 'get " \
                         "item name'."
+    HINT_INSTRUCTIONS = "If you're stuck, type 'hint'."
+    # GAME_INFO for each number of items, shared by every Game so each one
+    # doesn't hold its own copy.
+    _game_infos = {}
+    NO_HINT_MESSAGE = "There's no way to win from here."
+    NO_HINT_TABLE_MESSAGE = "This house is too big to give hints in."
     VALIDATION_MESSAGE = "Please enter a valid move."
     EXIT_MESSAGE = "Thanks for playing, hope you had fun!"
     WINNING_MESSAGE = "You see el Chupacabras!\nYou toss the goat plushie " \
@@ -250,20 +1190,95 @@ class Game:
                      "leaving hungry.\nYou become the first human victim " \
                      "of el Chupacabras.\nGame over."
 
-    def __init__(self):
-        self.rooms = {}
-        room_names = ["bedroom", "living room", "kids' room", "storage room",
-                      "kitchen", "bathroom", "garage", "backyard"]
-        for room in room_names:
-            self.rooms[room] = RoomFactory.create_room(room)
+    def __init__(self, world=None):
+        """
+        Constructs the Game object.
+
+        :param world: The layout of the house, from RoomFactory.load_world.
+            The house in rooms_config is used if it isn't given.
+        :type world: World or None
+        """
+        if world is None:
+            world = RoomFactory.get_world()
+        self.world = world
+        self.rooms = RoomMap(world)
+
+        first_room = self.rooms.get_by_id(world.start_room)
+        self.player = Player(first_room, self.rooms, self.world)
+        self.rooms.player = self.player
+
+        self.total_items = self.world.total_items
+        game_info = self._game_infos.get(self.total_items)
+        if game_info is None:
+            game_info = self.GAME_INFO.format(total_items=self.total_items)
+            self._game_infos[self.total_items] = game_info
+        self.game_info = game_info
+        self.listeners = []
+
+    def add_listener(self, listener):
+        """
+        Calls a function after every command the game processes and every
+        change of state made with set_state, including reset. It is called
+        with the game, the command typed or None, and the state from
+        get_state before the change.
+
+        :param listener: The function to call.
+        :type listener: function
+        """
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """
+        Stops calling a function added with add_listener.
+
+        :param listener: The function to stop calling.
+        :type listener: function
+        """
+        self.listeners.remove(listener)
+
+    def get_state(self):
+        """
+        Returns a snapshot of the game as a pair of integers: the id of the
+        player's room and the bitmask of the items they picked up. Every
+        other part of the game can be rebuilt from it.
+
+        :return: A tuple with a room id and an item bitmask.
+        :rtype: tuple
+        """
+        return self.player.get_state()
+
+    def set_state(self, state):
+        """
+        Restores the game to a snapshot returned by get_state. The player is
+        moved and given their items, and the items they picked up are
+        removed from the rooms.
+
+        :param state: A tuple with a room id and an item bitmask.
+        :type state: tuple
+        """
+        previous_state = self.player.room_id, self.player.items
+        self.player.set_state(state)
+        self.rooms.set_items(state[1])
+        for listener in self.listeners:
+            listener(self, None, previous_state)
 
-        first_room = self.rooms["bedroom"]
-        self.player = Player(first_room)
+    def reset(self):
+        """
+        Puts the game back to how it was when it was created: the player is
+        in the first room with no items and every item is back in its room.
+        Only the rooms created so far are touched, so it is much cheaper than
+        creating a new Game.
+        """
+        self.set_state((self.world.start_room, 0))
 
-        self.total_items = 0
-        for room in self.rooms.values():
-            if room.has_item():
-                self.total_items += 1
+    def __reduce__(self):
+        """
+        Pickles the game as its world id and state, so a pickled game is a
+        few dozen bytes no matter how big its world is. The listeners aren't
+        pickled.
+        """
+        return _restore_game, (self.world.world_id, self.player.room_id,
+                               self.player.items)
 
     def display_opening_message(self):
         """
@@ -275,9 +1290,10 @@ class Game:
         """
         messages = [
             self.WELCOME_MESSAGE,
-            self.GAME_INFO,
+            self.game_info,
             self.MOVING_INSTRUCTIONS,
             self.ITEM_INSTRUCTIONS,
+            self.HINT_INSTRUCTIONS,
             self.TEXT_DIVIDER
         ]
         return "\n".join(messages)
@@ -310,7 +1326,9 @@ class Game:
         Checks if the direction the player typed is valid, then checks if the
         room they are in has a room connecting to it in that direction.
         If it does, it updates the player's current_room to the room in that
-        direction to represent the player moving to a different room.
+        direction to represent the player moving to a different room. The
+        room is looked up in the world's exit columns, so moving doesn't
+        create any Rooms.
 
         :param direction: The direction provided by the player.
         :type direction: str
@@ -318,29 +1336,71 @@ class Game:
         that there are no rooms in the direction they want to move in.
         :rtype: str
         """
-        valid_directions = ["north", "south", "east", "west"]
-        if direction not in valid_directions:
+        column = self.world.DIRECTION_COLUMNS.get(direction)
+        if column is None:
             return self.VALIDATION_MESSAGE
-        if direction in self.player.current_room.exits:
-            room_name = self.player.current_room.exits[direction]
-            self.player.current_room = self.rooms[room_name]
-            return f"You moved to the {room_name}."
+        next_room = self.world.exits[column][self.player.room_id]
+        if next_room != -1:
+            self.player.room_id = next_room
+            return f"You moved to the {self.world.room_names[next_room]}."
         else:
             return f"There is no room in that direction."
 
+    def give_hint(self):
+        """
+        Looks up the best command to type next in the world's policy table,
+        so a hint takes the same time in any house once the table is loaded.
+
+        :return: A string with the command to type, or a message saying the
+            game can't be won anymore or the house has no policy table.
+        :rtype: str
+        """
+        policy = self.world.get_policy()
+        if policy is None:
+            return self.NO_HINT_TABLE_MESSAGE
+        room_id = self.player.room_id
+        state = self.player.items * len(self.world.room_names) + room_id
+        action = policy[state]
+        if action < len(self.world.DIRECTIONS):
+            return f"Hint: go {self.world.DIRECTIONS[action]}."
+        elif action == len(self.world.DIRECTIONS):
+            item_name = self.world.templates[room_id].item["item_name"]
+            return f"Hint: get {item_name}."
+        else:
+            return self.NO_HINT_MESSAGE
+
     def process_command(self, user_input):
         """
         Takes the user input, sanitizes it, then calls the appropriate function
-        to handle their command.
+        to handle their command. Afterwards it calls the game's listeners,
+        if it has any, with the state from before the command.
 
         :param user_input: The user input of what they want to do next in the
-            game. It should start with "go" or "get".
+            game. It should start with "go" or "get", or be "hint".
         :type user_input: str
         :return: The confirmation message returned from the function called
             according to the input, or a validation message if the input was
             not valid.
         :rtype: str
         """
+        if not self.listeners:
+            return self._handle_command(user_input)
+        previous_state = self.player.room_id, self.player.items
+        message = self._handle_command(user_input)
+        for listener in self.listeners:
+            listener(self, user_input, previous_state)
+        return message
+
+    def _handle_command(self, user_input):
+        """
+        Parses a command and calls the function that handles it, for
+        process_command.
+
+        :param user_input: The command the player typed.
+        :type user_input: str
+        :return: The message to show the player.
+        :rtype: str
+        """
         command = user_input.lower().strip().split()
         if len(command) == 0:
             return self.VALIDATION_MESSAGE
@@ -356,6 +1416,8 @@ class Game:
             else:
                 desired_item = " ".join(command[1:])
                 return self.player.get_item(desired_item)
+        elif command == ["hint"]:
+            return self.give_hint()
         else:
             return self.VALIDATION_MESSAGE
 
@@ -368,48 +1430,187 @@ class Game:
             continue the game until the player reaches the Chupacabra's room.
         :rtype: str or None
         """
-        if self.player.current_room.name == "backyard":
-            if len(self.player.inventory) < self.total_items:
+        if self.player.room_id == self.world.villain_room:
+            if self.player.items != self.world.all_items:
                 return "lost"
-            elif len(self.player.inventory) == self.total_items:
+            else:
                 return "won"
         else:
             return None
 
-    def play(self):
+    def play_session(self):
         """
-        This method controls the flow of the game by calling methods in a
-        while loop until the game is finished. It prints the opening messages,
-        player status and room status. It takes the user input, checking if it
-        is "q" for quitting the game. It calls the process_command method,
-        printing the results followed by a text divider for ease of reading.
-        It prints the winning or losing message before ending the game.
+        A resumable version of the game loop. It renders the same messages as
+        play(), but instead of calling input() and print() it yields the
+        rendered output of each turn and waits for the next command to be
+        sent in. This lets one process hold many suspended games at once.
 
-        :return: Nothing
-        :rtype: None
+        Start the session with next(), then send each command with
+        send_command() or the generator's send() method. When the game is
+        finished the generator returns its last output.
+
+        :return: A generator that yields the output of each turn as a string
+            and receives the player's commands.
+        :rtype: generator
         """
-        print(self.display_opening_message())
+        messages = [self.display_opening_message()]
         game_is_finished = False
 
         while not game_is_finished:
-            print(self.display_player_status())
-            print(self.display_room_status(self.player.current_room.name))
-            user_command = input("Enter your command:\n")
+            messages.append(self.display_player_status())
+            messages.append(
+                self.display_room_status(self.player.current_room.name))
+            user_command = yield "\n".join(messages)
+            messages = []
             if user_command.lower() == "q":
                 game_is_finished = True
             else:
-                print(self.process_command(user_command))
-            print(self.TEXT_DIVIDER)
+                messages.append(self.process_command(user_command))
+            messages.append(self.TEXT_DIVIDER)
             player_outcome = self.player_outcome()
             if player_outcome == "lost":
-                print(self.LOSING_MESSAGE)
+                messages.append(self.LOSING_MESSAGE)
                 game_is_finished = True
             elif player_outcome == "won":
-                print(self.WINNING_MESSAGE)
+                messages.append(self.WINNING_MESSAGE)
                 game_is_finished = True
             else:
                 continue
 
+        return "\n".join(messages)
+
+    def play(self):
+        """
+        This method controls the flow of the game by running play_session
+        until the game is finished. It prints the opening messages, player
+        status and room status of each turn and takes the user input to send
+        to the session. It prints the winning or losing message before ending
+        the game.
+
+        :return: Nothing
+        :rtype: None
+        """
+        session = self.play_session()
+        output = next(session)
+        game_is_finished = False
+
+        while not game_is_finished:
+            print(output)
+            user_command = input("Enter your command:\n")
+            output, game_is_finished = send_command(session, user_command)
+        print(output)
+
+    def run_commands(self, commands):
+        """
+        Plays the game headlessly from an iterable of commands instead of
+        input(), collecting the output play() would print for each turn.
+        The commands can come from a list, a generator, or a file or stdin
+        pipe with one command per line. The game stops when it is finished
+        or when there are no commands left.
+
+        :param commands: The commands to play, in order.
+        :type commands: iterable of str
+        :return: A tuple with the list of turn outputs play() would have
+            printed and the player outcome ("won", "lost" or None).
+        :rtype: tuple
+        """
+        session = self.play_session()
+        messages = [next(session)]
+
+        for user_command in commands:
+            output, game_is_finished = send_command(
+                session, user_command.rstrip("\r\n"))
+            messages.append(output)
+            if game_is_finished:
+                break
+
+        return messages, self.player_outcome()
+
+
+def _restore_template(world_id, room_id):
+    """
+    Unpickles a RoomTemplate from its world id and room id.
+
+    :rtype: RoomTemplate
+    """
+    return RoomFactory.get_world_by_id(world_id).templates[room_id]
+
+
+def _restore_room(world_id, room_id, has_item):
+    """
+    Unpickles a Room from its world id, room id and whether its item is
+    still there.
+
+    :rtype: Room
+    """
+    room = RoomFactory.create_room_by_id(
+        room_id, RoomFactory.get_world_by_id(world_id))
+    if not has_item:
+        room.remove_item()
+    return room
+
+
+def _restore_player(world_id, room_id, items):
+    """
+    Unpickles a Player as the player of a new Game in a state.
+
+    :rtype: Player
+    """
+    return _restore_game(world_id, room_id, items).player
+
+
+def _restore_game(world_id, room_id, items):
+    """
+    Unpickles a Game from its world id and state.
+
+    :rtype: Game
+    """
+    game = Game(RoomFactory.get_world_by_id(world_id))
+    if room_id != game.player.room_id or items:
+        game.set_state((room_id, items))
+    return game
+
+
+def send_command(session, user_command):
+    """
+    Sends a command to a session started with Game.play_session and returns
+    the output of that turn.
+
+    :param session: A started play_session generator.
+    :type session: generator
+    :param user_command: The command the player typed.
+    :type user_command: str
+    :return: A tuple with the output of the turn and whether the game is
+        finished.
+    :rtype: tuple
+    """
+    try:
+        return session.send(user_command), False
+    except StopIteration as finished:
+        return finished.value, True
+
+
+def run_transcript(commands, game=None):
+    """
+    Plays a new game headlessly from an iterable of commands, with no
+    terminal input or output. This is the entry point for replaying
+    recorded player sessions in bulk.
+
+    :param commands: The commands to play, in order.
+    :type commands: iterable of str
+    :param game: A Game to reset and reuse instead of creating a new one,
+        for batch runners that play many games back to back.
+    :type game: Game or None
+    :return: A tuple with the list of messages the game produced and the
+        player outcome ("won", "lost" or None).
+    :rtype: tuple
+    """
+    if game is None:
+        game = Game()
+    else:
+        game.reset()
+    return game.run_commands(commands)
+
 
 # rooms_config defines all the rooms in the game. Each key is a room name and
 # each value is a dictionary with the name (str) of the room, item
@@ -466,26 +1667,89 @@ rooms_config = {
     }
 }
 
+# The commands of a winning game in the house in rooms_config, for tests,
+# benchmarks and load runs.
+WINNING_SCRIPT = [
+    "go east", "get goat plushie", "go west", "go north", "get pro camera",
+    "go west", "get shampoo bottle", "go east", "go east", "get frying pan",
+    "go north", "get rope", "go south", "go west", "go north", "get machete",
+    "go east"
+]
+
 
-def main():
+def play_games(world=None):
     """
-    The entry point for the game. Creates a Game object and starts the game
-    loop. Restarts the game if the player ended the previous game and presses
-    "y", or ends the game and prints a goodbye message.
+    Creates a Game object and starts the game loop. Resets the game and
+    restarts it if the player ended the previous game and presses "y", or
+    ends the game and prints a goodbye message.
 
+    :param world: The layout of the house, or None for the house in
+        rooms_config.
+    :type world: World or None
     :return: Nothing
     :rtype: None
     """
     replay_game = True
+    game = Game(world)
 
     while replay_game:
-        game = Game()
         game.play()
 
         start_over_input = input("\nDo you want to play again? y/n\n")
         if start_over_input.lower() != "y":
             print("Thank you for playing!")
             break
+        game.reset()
+
+
+def solve_game(world=None):
+    """
+    Prints the shortest list of commands that wins the game and how many
+    commands it takes, the "par" of the house.
+
+    :param world: The layout of the house, or None for the house in
+        rooms_config.
+    :type world: World or None
+    :return: Nothing
+    :rtype: None
+    """
+    from solver import solve
+
+    commands = solve(world)
+    if commands is None:
+        print("This house can't be won.")
+    else:
+        print("\n".join(commands))
+        print(f"Par: {len(commands)} commands")
+
+
+def main(argv=None):
+    """
+    The entry point for the game. With no arguments it plays the game in the
+    terminal. The "solve" command prints the shortest winning game instead.
+
+    :param argv: The command line arguments, or None to use sys.argv.
+    :type argv: list or None
+    :return: Nothing
+    :rtype: None
+    """
+    parser = argparse.ArgumentParser(
+        description="A Visit from El Chupacabras.")
+    parser.add_argument("--world",
+                        help="A JSON or TOML world definition file to play "
+                             "instead of the default house.")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("play", help="Play the game (the default).")
+    subparsers.add_parser("solve", help="Print the shortest winning game.")
+    args = parser.parse_args(argv)
+
+    world = None
+    if args.world:
+        world = RoomFactory.load_world(args.world)
+    if args.command == "solve":
+        solve_game(world)
+    else:
+        play_games(world)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,299 @@
+# Exact outcome odds for A Visit from El Chupacabras.
+#
+# A player who types one of the four moves or "get" at random, like
+# simulate.RandomPolicy, makes the game an absorbing Markov chain over the
+# (room, items) states, with the villain room as the absorbing state. This
+# module solves that chain exactly instead of sampling it, giving the
+# chance of winning and losing and the expected number of commands for any
+# world.
+#
+# Items are never dropped, so the chain only moves from an item bitmask to
+# itself or to a bitmask with more bits. The bitmasks are solved from the
+# fullest one down, and each one is a linear system over the rooms whose
+# only unknowns are in that bitmask. The systems of every bitmask share the
+# same rows for rooms without items, so those rooms are eliminated once,
+# with a sparse Gaussian elimination that picks the room with the fewest
+# neighbours first to keep the elimination sparse. What is left is a small
+# dense system over the item rooms and the start room that is solved once
+# per bitmask.
+#
+# Usage: python markov.py [--world FILE]
+#
+
+import argparse
+import heapq
+import math
+from collections import deque, namedtuple
+
+from main import RoomFactory
+
+# The number of commands a random player chooses from: four moves and "get".
+ACTION_COUNT = 5
+
+
+class RandomWalkResult(namedtuple("RandomWalkResult",
+                                  ["won", "lost", "expected_commands",
+                                   "states"])):
+    """
+    A class to hold the exact outcome of a random player's game.
+
+    Attributes:
+        won (float): The chance of winning.
+        lost (float): The chance of losing.
+        expected_commands (float): The expected number of commands until the
+            game ends, or infinity if the player can get stuck in rooms that
+            don't lead to the villain room.
+        states (int): The number of (room, items) states in the chain,
+            counting every item bitmask for each room the player can reach.
+    """
+    __slots__ = ()
+
+
+def _get_reachable_rooms(world):
+    """
+    Finds the rooms a player can walk to from the start room without
+    walking through the villain room, and which of them still lead to the
+    villain room.
+
+    :param world: The layout of the house.
+    :type world: World
+    :return: A tuple with the set of reachable rooms, not counting the
+        villain room, and the set of those that can reach the villain room.
+    :rtype: tuple
+    """
+    villain_room = world.villain_room
+    reachable = {world.start_room}
+    to_visit = [world.start_room]
+    entrances = {}
+    while to_visit:
+        room_id = to_visit.pop()
+        for column in world.exits:
+            next_room = column[room_id]
+            if next_room == -1:
+                continue
+            entrances.setdefault(next_room, []).append(room_id)
+            if next_room != villain_room and next_room not in reachable:
+                reachable.add(next_room)
+                to_visit.append(next_room)
+
+    live = set()
+    queue = deque([villain_room])
+    while queue:
+        room_id = queue.popleft()
+        for previous_room in entrances.get(room_id, ()):
+            if previous_room not in live:
+                live.add(previous_room)
+                queue.append(previous_room)
+    return reachable, live
+
+
+def _eliminate(rows, rhs, keep):
+    """
+    Eliminates every room that isn't in keep from a sparse linear system,
+    leaving a system over the kept rooms only. Rooms are eliminated with
+    the fewest neighbours first.
+
+    :param rows: The system's rows, as dictionaries of coefficients keyed
+        by room id. They are changed in place.
+    :type rows: dict
+    :param rhs: The right-hand sides of each row, as lists with one entry
+        per right-hand side. They are changed in place.
+    :type rhs: dict
+    :param keep: The rooms not to eliminate.
+    :type keep: set
+    """
+    columns = {room_id: set() for room_id in rows}
+    for room_id, row in rows.items():
+        for other_room in row:
+            columns[other_room].add(room_id)
+
+    heap = [(len(rows[room_id]) + len(columns[room_id]), room_id)
+            for room_id in rows if room_id not in keep]
+    heapq.heapify(heap)
+    eliminated = set()
+    while heap:
+        degree, pivot = heapq.heappop(heap)
+        if pivot in eliminated:
+            continue
+        current = len(rows[pivot]) + len(columns[pivot])
+        if degree != current:
+            heapq.heappush(heap, (current, pivot))
+            continue
+        eliminated.add(pivot)
+
+        pivot_row = rows.pop(pivot)
+        pivot_rhs = rhs.pop(pivot)
+        diagonal = pivot_row.pop(pivot)
+        users = columns.pop(pivot)
+        users.discard(pivot)
+        for other_room in pivot_row:
+            columns[other_room].discard(pivot)
+        for room_id in users:
+            row = rows[room_id]
+            factor = row.pop(pivot) / diagonal
+            for other_room, value in pivot_row.items():
+                row[other_room] = row.get(other_room, 0.0) - factor * value
+                columns[other_room].add(room_id)
+            row_rhs = rhs[room_id]
+            for index, value in enumerate(pivot_rhs):
+                row_rhs[index] -= factor * value
+            if room_id not in keep:
+                heapq.heappush(heap, (len(row) + len(columns[room_id]),
+                                      room_id))
+
+
+def _solve_dense(matrix, vector):
+    """
+    Solves a small dense linear system with Gaussian elimination and
+    partial pivoting.
+
+    :param matrix: The coefficients, as a list of rows. It is changed in
+        place.
+    :type matrix: list
+    :param vector: The right-hand side. It is changed in place.
+    :type vector: list
+    :return: The solution.
+    :rtype: list
+    """
+    size = len(vector)
+    for column in range(size):
+        pivot = max(range(column, size),
+                    key=lambda row: abs(matrix[row][column]))
+        matrix[column], matrix[pivot] = matrix[pivot], matrix[column]
+        vector[column], vector[pivot] = vector[pivot], vector[column]
+        for row in range(column + 1, size):
+            factor = matrix[row][column] / matrix[column][column]
+            if factor:
+                for index in range(column, size):
+                    matrix[row][index] -= factor * matrix[column][index]
+                vector[row] -= factor * vector[column]
+    solution = [0.0] * size
+    for row in reversed(range(size)):
+        total = vector[row] - sum(matrix[row][index] * solution[index]
+                                  for index in range(row + 1, size))
+        solution[row] = total / matrix[row][row]
+    return solution
+
+
+def analyze_random_walk(world=None):
+    """
+    Computes the exact chance that a player who types random commands wins
+    or loses, and how many commands their game takes on average. Each turn
+    the player types one of the four moves or "get", with equal chances,
+    and "get" always names the item in the room if there is one.
+
+    :param world: The layout of the house. The house in rooms_config is
+        used if it isn't given.
+    :type world: World or None
+    :return: The outcome of the random player's game.
+    :rtype: RandomWalkResult
+    """
+    if world is None:
+        world = RoomFactory.get_world()
+    villain_room = world.villain_room
+    reachable, live = _get_reachable_rooms(world)
+    states = len(reachable) << world.total_items
+    if world.start_room not in live:
+        return RandomWalkResult(0.0, 0.0, math.inf, states)
+
+    item_bits = {room_id: 1 << index
+                 for index, room_id in enumerate(world.item_rooms)
+                 if room_id in live}
+    kept = sorted(set(item_bits) | {world.start_room})
+
+    # Each row says 5 x[room] - sum of x[next room] over the moves that stay
+    # among the live rooms = the right-hand sides. The first right-hand side
+    # counts the moves into the villain room, which scale the value of
+    # reaching it, and the second is the 5 in 5 x = 5 + ... that counts one
+    # command per turn. A "get" in a room whose item isn't taken yet leaves
+    # the bitmask, so item rooms start without the "get" that stays put.
+    rows = {}
+    rhs = {}
+    for room_id in live:
+        row = {room_id: float(ACTION_COUNT)}
+        to_villain = 0
+        for column in world.exits:
+            next_room = column[room_id]
+            if next_room == -1:
+                next_room = room_id
+            if next_room == villain_room:
+                to_villain += 1
+            elif next_room in live:
+                row[next_room] = row.get(next_room, 0.0) - 1
+        if room_id not in item_bits:
+            row[room_id] -= 1
+        rows[room_id] = row
+        rhs[room_id] = [float(to_villain), float(ACTION_COUNT)]
+    _eliminate(rows, rhs, set(kept))
+
+    # win, lose and commands hold the values of the item rooms for every
+    # bitmask solved so far.
+    win = {}
+    lose = {}
+    commands = {}
+    stuck = len(live) < len(reachable)
+    for items in range(world.all_items, -1, -1):
+        won = items == world.all_items
+        win_vector = []
+        lose_vector = []
+        command_vector = []
+        matrix = []
+        for room_id in kept:
+            row = rows[room_id]
+            matrix.append([row.get(other_room, 0.0) for other_room in kept])
+            to_villain, turn = rhs[room_id]
+            win_vector.append(to_villain if won else 0.0)
+            lose_vector.append(0.0 if won else to_villain)
+            command_vector.append(turn)
+            item_bit = item_bits.get(room_id, 0)
+            if item_bit & items:
+                matrix[-1][len(matrix) - 1] -= 1
+            elif item_bit:
+                next_items = items | item_bit
+                win_vector[-1] += win[next_items, room_id]
+                lose_vector[-1] += lose[next_items, room_id]
+                command_vector[-1] += commands[next_items, room_id]
+        solutions = [_solve_dense([list(row) for row in matrix], vector)
+                     for vector in (win_vector, lose_vector,
+                                    command_vector)]
+        for index, room_id in enumerate(kept):
+            if room_id in item_bits:
+                win[items, room_id] = solutions[0][index]
+                lose[items, room_id] = solutions[1][index]
+                commands[items, room_id] = solutions[2][index]
+
+    start = kept.index(world.start_room)
+    expected_commands = math.inf if stuck else solutions[2][start]
+    return RandomWalkResult(solutions[0][start], solutions[1][start],
+                            expected_commands, states)
+
+
+def main():
+    """
+    The entry point for the analysis. Parses the command line options and
+    prints the outcome of a random player's game.
+
+    :return: Nothing
+    :rtype: None
+    """
+    parser = argparse.ArgumentParser(
+        description="Compute the exact odds of a random player in A Visit "
+                    "from El Chupacabras.")
+    parser.add_argument("--world",
+                        help="A JSON, TOML or compiled world file to analyze "
+                             "instead of the default house.")
+    args = parser.parse_args()
+
+    if args.world:
+        world = RoomFactory.load_world(args.world)
+    else:
+        world = RoomFactory.get_world()
+    result = analyze_random_walk(world)
+    print(f"won: {result.won:.6%}")
+    print(f"lost: {result.lost:.6%}")
+    print(f"expected commands: {result.expected_commands:.2f}")
+    print(f"states: {result.states}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+# Mass replay of recorded transcripts for A Visit from El Chupacabras.
+#
+# Checking a rules change means replaying millions of recorded games, and
+# most of them start with the same commands. TranscriptTrie merges the
+# transcripts into a prefix trie, where each node holds the run of commands
+# up to the next place transcripts differ, and walks it depth first with a
+# single Game. Each shared prefix is played once: at a node with more than
+# one next command the game's state is saved with Game.get_state, and it is
+# restored with Game.set_state before each other branch is played.
+#
+# The outcome of every transcript is the same as run_transcript's: a game
+# stops at the first command that wins or loses it or at "q", and the
+# commands after that are ignored.
+#
+# Usage: python mass_replay.py TRANSCRIPT_FILE... [--world FILE]
+#
+
+import argparse
+from collections import Counter
+
+from main import Game, RoomFactory
+
+
+class _TrieNode:
+    """
+    A class to represent a run of commands in a TranscriptTrie. Commands
+    that only one branch of the trie goes through are kept in one node, so
+    the tail of a transcript nobody else typed costs a single node.
+
+    Attributes:
+        commands (list): The commands typed to get to this node from its
+            parent. The root node has none.
+        children (dict): The next nodes, keyed by their first command.
+        ends (list): The indexes of the transcripts that end here.
+    """
+    __slots__ = ("commands", "children", "ends")
+
+    def __init__(self, commands):
+        """
+        Constructs the _TrieNode object.
+
+        :param commands: The commands typed to get to this node.
+        :type commands: list
+        """
+        self.commands = commands
+        self.children = {}
+        self.ends = []
+
+    def split(self, position):
+        """
+        Splits the node's commands in two, moving the commands from a
+        position on, the children and the transcripts that end here to a
+        new child. The node stays in its parent's children.
+
+        :param position: The number of commands to keep in this node.
+        :type position: int
+        """
+        tail = _TrieNode(self.commands[position:])
+        tail.children = self.children
+        tail.ends = self.ends
+        self.commands = self.commands[:position]
+        self.children = {tail.commands[0]: tail}
+        self.ends = []
+
+
+class TranscriptTrie:
+    """
+    A class to replay many transcripts at once, playing the commands they
+    start with only once.
+
+    Attributes:
+        count (int): The number of transcripts added.
+        commands (int): The number of commands in every transcript added.
+        commands_run (int): The number of commands the last replay typed.
+
+    Methods:
+        add(commands): Adds a transcript.
+        replay(world): Plays every transcript and returns their outcomes.
+    """
+    def __init__(self):
+        """
+        Constructs an empty TranscriptTrie object.
+        """
+        self._root = _TrieNode([])
+        self.count = 0
+        self.commands = 0
+        self.commands_run = 0
+
+    def add(self, commands):
+        """
+        Adds a transcript. Line endings are stripped from the commands, like
+        in Game.run_commands.
+
+        :param commands: The commands of the transcript, in order.
+        :type commands: iterable of str
+        :return: The index of the transcript, its position in the outcomes
+            returned by replay.
+        :rtype: int
+        """
+        commands = [command.rstrip("\r\n") for command in commands]
+        self.commands += len(commands)
+        node = self._root
+        position = 0
+        while position < len(commands):
+            child = node.children.get(commands[position])
+            if child is None:
+                child = _TrieNode(commands[position:])
+                node.children[commands[position]] = child
+                node = child
+                break
+            shared = child.commands
+            length = min(len(shared), len(commands) - position)
+            if shared[:length] != commands[position:position + length]:
+                length = 1
+                while shared[length] == commands[position + length]:
+                    length += 1
+            if length < len(shared):
+                child.split(length)
+            node = child
+            position += length
+        node.ends.append(self.count)
+        self.count += 1
+        return self.count - 1
+
+    def replay(self, world=None):
+        """
+        Plays every transcript from the start of a new game and returns
+        their outcomes.
+
+        :param world: The layout of the house. The house in rooms_config is
+            used if it isn't given.
+        :type world: World or None
+        :return: The outcome of each transcript ("won", "lost" or None), by
+            index.
+        :rtype: list
+        """
+        game = Game(world)
+        outcomes = [None] * self.count
+        commands_run = 0
+        # Each entry is a saved state and the node to play from it.
+        stack = [(game.get_state(), self._root)]
+        while stack:
+            state, node = stack.pop()
+            game.set_state(state)
+            while True:
+                finished = False
+                for command in node.commands:
+                    if command.lower() == "q":
+                        finished = True
+                        break
+                    game.process_command(command)
+                    commands_run += 1
+                    if game.player_outcome() is not None:
+                        finished = True
+                        break
+                if finished:
+                    self._set_outcomes(node, game.player_outcome(), outcomes)
+                    break
+                if not node.children:
+                    break
+                branches = iter(node.children.values())
+                next_node = next(branches)
+                if len(node.children) > 1:
+                    state = game.get_state()
+                    for other_node in branches:
+                        stack.append((state, other_node))
+                node = next_node
+        self.commands_run = commands_run
+        return outcomes
+
+    @staticmethod
+    def _set_outcomes(node, outcome, outcomes):
+        """
+        Sets the outcome of every transcript that goes through a node, for
+        when the game ends in it.
+
+        :param node: The node the game ended in.
+        :type node: _TrieNode
+        :param outcome: The outcome of the game.
+        :type outcome: str or None
+        :param outcomes: The outcomes of every transcript, by index.
+        :type outcomes: list
+        """
+        to_visit = [node]
+        while to_visit:
+            node = to_visit.pop()
+            for index in node.ends:
+                outcomes[index] = outcome
+            to_visit.extend(node.children.values())
+
+
+def replay_transcripts(transcripts, world=None):
+    """
+    Plays many transcripts through a TranscriptTrie and returns their
+    outcomes, the same as calling run_transcript on each of them.
+
+    :param transcripts: The transcripts, each an iterable of commands.
+    :type transcripts: iterable
+    :param world: The layout of the house. The house in rooms_config is used
+        if it isn't given.
+    :type world: World or None
+    :return: The outcome of each transcript ("won", "lost" or None), in
+        order.
+    :rtype: list
+    """
+    trie = TranscriptTrie()
+    for commands in transcripts:
+        trie.add(commands)
+    return trie.replay(world)
+
+
+def main():
+    """
+    The entry point for mass replay. Replays transcript files with one
+    command per line and prints how many were won, lost or unfinished and
+    how many commands the shared prefixes saved.
+
+    :return: Nothing
+    :rtype: None
+    """
+    parser = argparse.ArgumentParser(
+        description="Replay many transcripts of A Visit from El "
+                    "Chupacabras at once.")
+    parser.add_argument("transcript_files", nargs="+")
+    parser.add_argument("--world",
+                        help="A JSON, TOML or compiled world file to play "
+                             "instead of the default house.")
+    args = parser.parse_args()
+
+    world = None
+    if args.world:
+        world = RoomFactory.load_world(args.world)
+    trie = TranscriptTrie()
+    for path in args.transcript_files:
+        with open(path) as transcript_file:
+            trie.add(transcript_file)
+    outcomes = trie.replay(world)
+
+    for outcome, count in Counter(outcomes).most_common():
+        name = outcome if outcome is not None else "unfinished"
+        print(f"{name}: {count}")
+    print(f"{trie.commands_run} of {trie.commands} commands played.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+# A line-protocol TCP server for A Visit from El Chupacabras.
+#
+# Every connection gets its own Game, driven through Game.play_session, so
+# thousands of players can share one process and one event loop without a
+# thread per player. The server sends the same messages the terminal game
+# prints, and each prompt is sent on its own line so clients know when the
+# server is waiting for a command.
+#
+# With --journal-dir, every session's commands are recorded in a journal
+# file in that directory, which journal.py can print and replay.
+#
+# Usage: python server.py [--host HOST] [--port PORT] [--world FILE]
+#                         [--journal-dir DIR]
+#
+
+import argparse
+import asyncio
+import os
+import time
+
+from journal import JournalWriter
+from main import Game, RoomFactory, send_command
+
+COMMAND_PROMPT = "Enter your command:"
+REPLAY_PROMPT = "Do you want to play again? y/n"
+GOODBYE_MESSAGE = "Thank you for playing!"
+
+
+class GameServer:
+    """
+    A class to serve the game to many players at once over TCP.
+
+    Attributes:
+        host (str): The interface the server listens on.
+        port (int): The port the server listens on.
+        max_line_length (int): The longest command a client can send, in
+            bytes. It bounds the memory each session can use for buffering.
+        idle_timeout (float): Seconds a client can stay silent before the
+            server closes the connection.
+        sessions (int): The number of players currently connected.
+        world (World or None): The layout of the house every game is played
+            in, or None for the house in rooms_config.
+        journal_dir (str or None): The directory session journals are
+            written to, or None to not record sessions.
+
+    Methods:
+        handle_client(reader, writer): Plays games with one client until they
+            quit, stop replaying, go idle, or disconnect.
+        start(): Starts listening for connections.
+        serve_forever(): Starts the server and serves clients until the task
+            is cancelled.
+    """
+    def __init__(self, host="127.0.0.1", port=8023, max_line_length=256,
+                 idle_timeout=300.0, world=None, journal_dir=None):
+        """
+        Constructs the GameServer object.
+
+        :param host: The interface the server listens on.
+        :type host: str
+        :param port: The port the server listens on. Use 0 to pick a free
+            port.
+        :type port: int
+        :param max_line_length: The longest command a client can send, in
+            bytes.
+        :type max_line_length: int
+        :param idle_timeout: Seconds a client can stay silent before the
+            server closes the connection.
+        :type idle_timeout: float
+        :param world: The layout of the house every game is played in, or
+            None for the house in rooms_config.
+        :type world: World or None
+        :param journal_dir: The directory to write session journals to, or
+            None to not record sessions.
+        :type journal_dir: str or None
+        """
+        self.host = host
+        self.port = port
+        self.max_line_length = max_line_length
+        self.idle_timeout = idle_timeout
+        self.sessions = 0
+        self.world = world
+        self.journal_dir = journal_dir
+        self._server = None
+        # Journal files are named after the time the server started and the
+        # number of the connection.
+        self._started = time.strftime("%Y%m%d-%H%M%S")
+        self._connections = 0
+
+    async def _send(self, writer, text):
+        """
+        Sends text to the client followed by a newline, waiting for the
+        client to read it if the transport buffer is full.
+
+        :param writer: The stream to write to.
+        :type writer: asyncio.StreamWriter
+        :param text: The text to send.
+        :type text: str
+        """
+        writer.write(text.encode() + b"\n")
+        await writer.drain()
+
+    async def _read_line(self, reader):
+        """
+        Reads one line from the client.
+
+        :param reader: The stream to read from.
+        :type reader: asyncio.StreamReader
+        :return: The line without its line ending, or None if the client
+            disconnected, went idle, or sent a line that was too long.
+        :rtype: str or None
+        """
+        try:
+            line = await asyncio.wait_for(reader.readline(),
+                                          self.idle_timeout)
+        except (asyncio.TimeoutError, ValueError, ConnectionError):
+            return None
+        if not line:
+            return None
+        return line.decode(errors="replace").rstrip("\r\n")
+
+    async def handle_client(self, reader, writer):
+        """
+        Plays games with one client until they quit, stop replaying, go
+        idle, or disconnect. Like main(), it asks the client if they want to
+        play again after each game.
+
+        :param reader: The stream to read the client's commands from.
+        :type reader: asyncio.StreamReader
+        :param writer: The stream to send the game's output to.
+        :type writer: asyncio.StreamWriter
+        """
+        self.sessions += 1
+        self._connections += 1
+        journal = None
+        try:
+            replay_game = True
+            game = Game(self.world)
+            if self.journal_dir is not None:
+                journal = JournalWriter(
+                    os.path.join(self.journal_dir, f"{self._started}-"
+                                 f"{self._connections}.journal"), game)
+            while replay_game:
+                session = game.play_session()
+                output = next(session)
+                game_is_finished = False
+
+                while not game_is_finished:
+                    await self._send(writer, output)
+                    await self._send(writer, COMMAND_PROMPT)
+                    user_command = await self._read_line(reader)
+                    if user_command is None:
+                        return
+                    output, game_is_finished = send_command(session,
+                                                            user_command)
+                await self._send(writer, output)
+
+                await self._send(writer, "\n" + REPLAY_PROMPT)
+                start_over_input = await self._read_line(reader)
+                if start_over_input is None:
+                    return
+                if start_over_input.lower() != "y":
+                    await self._send(writer, GOODBYE_MESSAGE)
+                    replay_game = False
+                else:
+                    game.reset()
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions -= 1
+            if journal is not None:
+                journal.close()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start(self):
+        """
+        Starts listening for connections. If the port was 0, the port
+        attribute is updated to the port the server is listening on.
+        """
+        self._server = await asyncio.start_server(
+            self.handle_client, self.host, self.port,
+            limit=self.max_line_length, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """
+        Starts the server and serves clients until the task is cancelled.
+        """
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+
+def main():
+    """
+    The entry point for the server. Parses the command line options and
+    serves the game until it is interrupted.
+
+    :return: Nothing
+    :rtype: None
+    """
+    parser = argparse.ArgumentParser(
+        description="Serve A Visit from El Chupacabras over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8023)
+    parser.add_argument("--idle-timeout", type=float, default=300.0)
+    parser.add_argument("--world",
+                        help="A JSON or TOML world definition file to serve "
+                             "instead of the default house.")
+    parser.add_argument("--journal-dir",
+                        help="A directory to record every session's "
+                             "commands in.")
+    args = parser.parse_args()
+
+    if args.world:
+        world = RoomFactory.load_world(args.world)
+    else:
+        world = RoomFactory.get_world()
+    # Load the hint table before taking players, from the disk cache if the
+    # world has been served before. Worlds too big for a table get none.
+    if world.get_policy() is None:
+        print("The world is too big for hints.")
+    if args.journal_dir:
+        os.makedirs(args.journal_dir, exist_ok=True)
+    server = GameServer(args.host, args.port, idle_timeout=args.idle_timeout,
+                        world=world, journal_dir=args.journal_dir)
+    print(f"Serving on {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+# A durable session store for A Visit from El Chupacabras.
+#
+# SessionStore keeps games in an SQLite file, keyed by a session id, so
+# players can pick up where they left off after the server restarts. A game
+# is saved as its snapshot from Game.get_state and the id of its world, a
+# few small values per session. The item bitmask is stored as little-endian
+# bytes, since SQLite integers stop at 63 bits and worlds can have more
+# items.
+#
+# The store listens to every game it hands out and marks a session dirty
+# only when a command or set_state actually changes its state, so moves
+# into walls and hints cost nothing. Dirty sessions are written together in
+# one transaction at most every commit_interval seconds, in WAL mode, so a
+# busy server does one small commit for many turns. Recently used games are
+# kept in memory, so resuming a session doesn't read the file.
+#
+
+import sqlite3
+import time
+from collections import OrderedDict
+from functools import partial
+
+from main import Game, RoomFactory
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    world_id TEXT NOT NULL,
+    room_id INTEGER NOT NULL,
+    items BLOB NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+
+
+def _encode_items(items):
+    """
+    Packs an item bitmask into the bytes stored in the items column.
+
+    :param items: The item bitmask.
+    :type items: int
+    :return: The bitmask as little-endian bytes, with no trailing zeros.
+    :rtype: bytes
+    """
+    return items.to_bytes((items.bit_length() + 7) // 8, "little")
+
+
+def _decode_items(items):
+    """
+    Reads an item bitmask from the items column. Files written before the
+    column held bytes store it as an integer, which is returned as is.
+
+    :param items: The stored bitmask.
+    :type items: bytes or int
+    :return: The item bitmask.
+    :rtype: int
+    """
+    if isinstance(items, int):
+        return items
+    return int.from_bytes(items, "little")
+
+
+class SessionStore:
+    """
+    A class to save games in an SQLite file and resume them by session id.
+
+    Attributes:
+        path (str): The SQLite file.
+        commit_interval (float): The shortest time between two commits, in
+            seconds.
+        cache_size (int): The number of games kept in memory.
+
+    Methods:
+        open_session(session_id, world): Returns the game of a session,
+            resuming it or starting a new one.
+        close_session(session_id): Saves a session and stops listening to
+            its game.
+        delete_session(session_id): Forgets a session.
+        flush_if_due(): Saves the dirty sessions if commit_interval has
+            passed since the last commit.
+        flush(): Saves the dirty sessions now.
+        close(): Saves the dirty sessions and closes the file.
+    """
+    def __init__(self, path, commit_interval=0.05, cache_size=10000):
+        """
+        Constructs the SessionStore object, creating the file if needed.
+
+        :param path: The SQLite file.
+        :type path: str
+        :param commit_interval: The shortest time between two commits, in
+            seconds.
+        :type commit_interval: float
+        :param cache_size: The number of games kept in memory.
+        :type cache_size: int
+        """
+        self.path = path
+        self.commit_interval = commit_interval
+        self.cache_size = cache_size
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(SCHEMA)
+        self._connection.commit()
+        self._cache = OrderedDict()
+        self._listeners = {}
+        self._dirty = {}
+        self._last_commit = time.monotonic()
+
+    def open_session(self, session_id, world=None):
+        """
+        Returns the game of a session. It is taken from memory if it is
+        there, read from the file if it was saved, and otherwise started in
+        a world and saved with the next commit. The store listens to the
+        game until the session is closed.
+
+        :param session_id: The session id.
+        :type session_id: str
+        :param world: The layout of the house for a new session. The house
+            in rooms_config is used if it isn't given. Saved sessions are
+            resumed in the world they were saved in.
+        :type world: World or None
+        :return: The session's game.
+        :rtype: Game
+        :raises KeyError: If the session was saved in a world that hasn't
+            been loaded.
+        """
+        game = self._cache.get(session_id)
+        if game is not None:
+            self._cache.move_to_end(session_id)
+        else:
+            game = self._listeners.get(session_id, (None, None))[0]
+        if game is None:
+            row = self._connection.execute(
+                "SELECT world_id, room_id, items FROM sessions "
+                "WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None:
+                game = Game(world)
+                self._dirty[session_id] = game
+            else:
+                world_id, room_id, items = row
+                game = Game(RoomFactory.get_world_by_id(world_id))
+                game.set_state((room_id, _decode_items(items)))
+        if session_id not in self._listeners:
+            listener = partial(self._record, session_id)
+            game.add_listener(listener)
+            self._listeners[session_id] = game, listener
+        self._cache[session_id] = game
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return game
+
+    def close_session(self, session_id):
+        """
+        Saves a session if it changed and stops listening to its game. The
+        game stays in memory until other sessions push it out.
+
+        :param session_id: The session id.
+        :type session_id: str
+        """
+        if session_id in self._dirty:
+            self.flush()
+        game, listener = self._listeners.pop(session_id, (None, None))
+        if game is not None:
+            game.remove_listener(listener)
+
+    def delete_session(self, session_id):
+        """
+        Forgets a session, in memory and in the file.
+
+        :param session_id: The session id.
+        :type session_id: str
+        """
+        self.close_session(session_id)
+        self._cache.pop(session_id, None)
+        with self._connection:
+            self._connection.execute(
+                "DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def _record(self, session_id, game, command, previous_state):
+        """
+        Marks a session dirty if its state changed. It is the listener added
+        to each session's game.
+
+        :param session_id: The session id.
+        :type session_id: str
+        :param game: The session's game.
+        :type game: Game
+        :param command: The command typed, or None if the state was set.
+        :type command: str or None
+        :param previous_state: The state before the change.
+        :type previous_state: tuple
+        """
+        player = game.player
+        if player.room_id != previous_state[0] or \
+                player.items != previous_state[1]:
+            self._dirty[session_id] = game
+            self.flush_if_due()
+
+    def flush_if_due(self):
+        """
+        Saves the dirty sessions if commit_interval has passed since the
+        last commit. Servers should also call it on a timer, so the last
+        changes are saved when players stop typing.
+        """
+        if self._dirty and \
+                time.monotonic() - self._last_commit >= self.commit_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Saves every dirty session in one transaction.
+        """
+        if self._dirty:
+            now = time.time()
+            rows = [(session_id, game.world.world_id, game.player.room_id,
+                     _encode_items(game.player.items), now)
+                    for session_id, game in self._dirty.items()]
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT INTO sessions VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (session_id) DO UPDATE SET "
+                    "world_id = excluded.world_id, "
+                    "room_id = excluded.room_id, items = excluded.items, "
+                    "updated = excluded.updated", rows)
+            self._dirty.clear()
+        self._last_commit = time.monotonic()
+
+    def close(self):
+        """
+        Saves the dirty sessions, stops listening to every game and closes
+        the file.
+        """
+        self.flush()
+        for game, listener in self._listeners.values():
+            game.remove_listener(listener)
+        self._listeners.clear()
+        self._cache.clear()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
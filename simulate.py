@@ -0,0 +1,540 @@
+# A Monte Carlo simulator for A Visit from El Chupacabras.
+#
+# It plays many games with a player policy and counts how often the player
+# wins or loses and how many commands each game takes. The games are played
+# on integer tables built from a World, with the same rules as
+# Game.process_command and Game.player_outcome, so no Game, Room or Player
+# objects or command strings are created while simulating.
+#
+# Games can be spread over a process pool. The games are split into a fixed
+# number of shards, each with a seed drawn from the master seed, so the
+# merged results only depend on the master seed and not on how many
+# processes played them.
+#
+# Usage: python simulate.py [--policy random|greedy|optimal] [--games N]
+#                           [--seed S] [--max-turns T] [--workers W]
+#                           [--shards S] [--world FILE]
+#
+
+import argparse
+import os
+import random
+from array import array
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from main import RoomFactory, World
+from solver import solve
+
+DIRECTIONS = World.DIRECTIONS
+# The action code of the "get" command. Codes 0 to 3 are the moves in
+# DIRECTIONS.
+GET = World.GET
+
+
+class WorldTables:
+    """
+    A class to hold a World as flat integer tables for fast simulation.
+
+    Attributes:
+        world (World): The layout of the house.
+        exits (tuple): The world's exit columns, one per direction in
+            DIRECTIONS, with -1 where there is no room in that direction.
+        item_bits (list): The item bit of each room, or 0 if it has no item,
+            from World.item_bits.
+        entrances (list): For each room, the (room id, action code) pairs of
+            the moves that lead into it.
+
+    Methods:
+        get_distances(target): Returns the number of moves from every room
+            to a room and the first direction to take.
+    """
+    def __init__(self, world):
+        """
+        Constructs the WorldTables object.
+
+        :param world: The layout of the house.
+        :type world: World
+        """
+        self.world = world
+        room_count = len(world.room_names)
+        self.exits = world.exits
+        self.item_bits = world.item_bits
+        self.entrances = [[] for _ in range(room_count)]
+        for action, column in enumerate(self.exits):
+            for room_id, next_room in enumerate(column):
+                if next_room != -1:
+                    self.entrances[next_room].append((room_id, action))
+
+    def get_distances(self, target):
+        """
+        Returns the number of moves from every room to a room and the first
+        direction to take, never going through the villain room on the way.
+
+        :param target: The id of the room to go to.
+        :type target: int
+        :return: A tuple with an array of distances (-1 if the target can't
+            be reached) and an array of action codes.
+        :rtype: tuple
+        """
+        room_count = len(self.world.room_names)
+        distances = array("i", [-1]) * room_count
+        first_moves = array("b", [-1]) * room_count
+        distances[target] = 0
+        queue = deque([target])
+        while queue:
+            room_id = queue.popleft()
+            if room_id == self.world.villain_room and room_id != target:
+                continue
+            for previous_room, action in self.entrances[room_id]:
+                if distances[previous_room] == -1:
+                    distances[previous_room] = distances[room_id] + 1
+                    first_moves[previous_room] = action
+                    queue.append(previous_room)
+        return distances, first_moves
+
+
+class RandomPolicy:
+    """
+    A player who types one of the four moves or "get" at random, with equal
+    chances.
+
+    Methods:
+        start_game(): Gets the policy ready for a new game.
+        choose(room_id, items, rng): Returns the next action code.
+    """
+    def start_game(self):
+        """
+        Gets the policy ready for a new game.
+        """
+
+    def choose(self, room_id, items, rng):
+        """
+        Returns the next action code.
+
+        :param room_id: The id of the room the player is in.
+        :type room_id: int
+        :param items: The player's item bitmask.
+        :type items: int
+        :param rng: The random number generator of the simulation.
+        :type rng: random.Random
+        :return: An action code from 0 to GET.
+        :rtype: int
+        """
+        return rng.randrange(GET + 1)
+
+
+class GreedyPolicy:
+    """
+    A player who picks up the item in their room if there is one, and
+    otherwise walks toward the nearest item they don't have. When they have
+    every item, they walk to the villain room.
+
+    Methods:
+        start_game(): Gets the policy ready for a new game.
+        choose(room_id, items, rng): Returns the next action code.
+    """
+    def __init__(self, tables):
+        """
+        Constructs the GreedyPolicy object, working out the shortest paths
+        to every item and to the villain room.
+
+        :param tables: The world to play in.
+        :type tables: WorldTables
+        """
+        self.tables = tables
+        world = tables.world
+        self.item_paths = [
+            (1 << index, tables.get_distances(room_id))
+            for index, room_id in enumerate(world.item_rooms)]
+        self.villain_path = tables.get_distances(world.villain_room)
+        self.all_items = world.all_items
+
+    def start_game(self):
+        """
+        Gets the policy ready for a new game.
+        """
+
+    def choose(self, room_id, items, rng):
+        """
+        Returns the next action code.
+
+        :param room_id: The id of the room the player is in.
+        :type room_id: int
+        :param items: The player's item bitmask.
+        :type items: int
+        :param rng: The random number generator of the simulation.
+        :type rng: random.Random
+        :return: An action code from 0 to GET.
+        :rtype: int
+        """
+        item_bit = self.tables.item_bits[room_id]
+        if item_bit and not items & item_bit:
+            return GET
+        if items == self.all_items:
+            return self.villain_path[1][room_id]
+
+        best_distance = -1
+        best_move = GET
+        for item_bit, (distances, first_moves) in self.item_paths:
+            distance = distances[room_id]
+            if items & item_bit or distance == -1:
+                continue
+            if best_distance == -1 or distance < best_distance:
+                best_distance = distance
+                best_move = first_moves[room_id]
+        return best_move
+
+
+class OptimalPolicy:
+    """
+    A player who plays the shortest winning game found by the solver.
+
+    Methods:
+        start_game(): Gets the policy ready for a new game.
+        choose(room_id, items, rng): Returns the next action code.
+    """
+    def __init__(self, tables):
+        """
+        Constructs the OptimalPolicy object by solving the world.
+
+        :param tables: The world to play in.
+        :type tables: WorldTables
+        """
+        commands = solve(tables.world) or []
+        self.actions = [GET if command.startswith("get ")
+                        else DIRECTIONS.index(command[3:])
+                        for command in commands]
+        self.turn = 0
+
+    def start_game(self):
+        """
+        Gets the policy ready for a new game.
+        """
+        self.turn = 0
+
+    def choose(self, room_id, items, rng):
+        """
+        Returns the next action code.
+
+        :param room_id: The id of the room the player is in.
+        :type room_id: int
+        :param items: The player's item bitmask.
+        :type items: int
+        :param rng: The random number generator of the simulation.
+        :type rng: random.Random
+        :return: An action code from 0 to GET.
+        :rtype: int
+        """
+        if self.turn >= len(self.actions):
+            return GET
+        action = self.actions[self.turn]
+        self.turn += 1
+        return action
+
+
+POLICIES = {
+    "random": lambda tables: RandomPolicy(),
+    "greedy": GreedyPolicy,
+    "optimal": OptimalPolicy,
+}
+
+
+class SimulationResult:
+    """
+    A class to hold the statistics of many simulated games.
+
+    Attributes:
+        games (int): The number of games played.
+        turns (int): The total number of commands typed in all games.
+        outcomes (Counter): The number of games "won", "lost", or
+            "unfinished" because they reached the turn limit.
+        moves (dict): A Counter of game lengths for each outcome.
+        room_visits (Counter): The number of times the player entered each
+            room, keyed by room id. The first room counts once per game.
+
+    Methods:
+        add_game(outcome, turns): Counts one game.
+        merge(other): Adds the statistics of another SimulationResult.
+        get_histogram(outcome, width): Draws the game lengths of an outcome
+            as a text histogram.
+    """
+    def __init__(self):
+        """
+        Constructs an empty SimulationResult object.
+        """
+        self.games = 0
+        self.turns = 0
+        self.outcomes = Counter()
+        self.moves = {}
+        self.room_visits = Counter()
+
+    def add_game(self, outcome, turns):
+        """
+        Counts one game.
+
+        :param outcome: "won", "lost" or "unfinished".
+        :type outcome: str
+        :param turns: The number of commands typed in the game.
+        :type turns: int
+        """
+        self.games += 1
+        self.turns += turns
+        self.outcomes[outcome] += 1
+        self.moves.setdefault(outcome, Counter())[turns] += 1
+
+    def merge(self, other):
+        """
+        Adds the statistics of another SimulationResult to this one.
+
+        :param other: The statistics to add.
+        :type other: SimulationResult
+        """
+        self.games += other.games
+        self.turns += other.turns
+        self.outcomes.update(other.outcomes)
+        for outcome, lengths in other.moves.items():
+            self.moves.setdefault(outcome, Counter()).update(lengths)
+        self.room_visits.update(other.room_visits)
+
+    def get_histogram(self, outcome, width=50):
+        """
+        Draws the game lengths of an outcome as a text histogram, one line
+        per length.
+
+        :param outcome: "won", "lost" or "unfinished".
+        :type outcome: str
+        :param width: The length of the longest bar.
+        :type width: int
+        :return: The histogram, or an empty string if no game had that
+            outcome.
+        :rtype: str
+        """
+        lengths = self.moves.get(outcome)
+        if not lengths:
+            return ""
+        largest = max(lengths.values())
+        lines = []
+        for turns in sorted(lengths):
+            count = lengths[turns]
+            bar = "#" * max(1, count * width // largest)
+            lines.append(f"{turns:5d} {count:9d} {bar}")
+        return "\n".join(lines)
+
+
+class Simulator:
+    """
+    A class to play many games with a policy using the rules of Game.
+
+    Attributes:
+        tables (WorldTables): The world the games are played in.
+        max_turns (int): The number of commands after which a game is
+            stopped and counted as "unfinished".
+
+    Methods:
+        play_game(policy, rng, room_visits): Plays one game and returns its
+            outcome and length.
+        run(policy, games, seed): Plays many games and returns their
+            statistics.
+    """
+    def __init__(self, world=None, max_turns=1000):
+        """
+        Constructs the Simulator object.
+
+        :param world: The layout of the house. The house in rooms_config is
+            used if it isn't given.
+        :type world: World or None
+        :param max_turns: The number of commands after which a game is
+            stopped.
+        :type max_turns: int
+        """
+        if world is None:
+            world = RoomFactory.get_world()
+        self.tables = WorldTables(world)
+        self.max_turns = max_turns
+
+    def play_game(self, policy, rng, room_visits):
+        """
+        Plays one game. A move toward a wall or a "get" in a room with no
+        item left uses up a turn without changing anything, just like in
+        Game.process_command.
+
+        :param policy: The player policy.
+        :type policy: RandomPolicy, GreedyPolicy or OptimalPolicy
+        :param rng: The random number generator to give the policy.
+        :type rng: random.Random
+        :param room_visits: The number of times each room was entered, by
+            room id. It is updated with the rooms of this game.
+        :type room_visits: array
+        :return: A tuple with the outcome and the number of commands typed.
+        :rtype: tuple
+        """
+        world = self.tables.world
+        exits = self.tables.exits
+        item_bits = self.tables.item_bits
+        villain_room = world.villain_room
+        room_id = world.start_room
+        items = 0
+        room_visits[room_id] += 1
+
+        policy.start_game()
+        for turn in range(1, self.max_turns + 1):
+            action = policy.choose(room_id, items, rng)
+            if action == GET:
+                items |= item_bits[room_id]
+            else:
+                next_room = exits[action][room_id]
+                if next_room != -1:
+                    room_id = next_room
+                    room_visits[room_id] += 1
+                    if room_id == villain_room:
+                        if items == world.all_items:
+                            return "won", turn
+                        return "lost", turn
+        return "unfinished", self.max_turns
+
+    def run(self, policy, games, seed=None):
+        """
+        Plays many games and returns their statistics.
+
+        :param policy: The player policy.
+        :type policy: RandomPolicy, GreedyPolicy or OptimalPolicy
+        :param games: The number of games to play.
+        :type games: int
+        :param seed: The seed of the random number generator, so results
+            can be repeated.
+        :type seed: int or None
+        :return: The statistics of the games.
+        :rtype: SimulationResult
+        """
+        rng = random.Random(seed)
+        result = SimulationResult()
+        room_visits = array("q", [0]) * len(self.tables.world.room_names)
+        for _ in range(games):
+            outcome, turns = self.play_game(policy, rng, room_visits)
+            result.add_game(outcome, turns)
+        result.room_visits.update({room_id: count for room_id, count
+                                   in enumerate(room_visits) if count})
+        return result
+
+
+def _run_shard(shard):
+    """
+    Plays one shard of games in a worker process. Each worker builds its
+    own Simulator and policy, so only the shard's settings and its
+    statistics are sent between processes.
+
+    :param shard: A tuple with the policy name, the number of games, the
+        shard's seed, the turn limit and the world definition file, or None
+        for the house in rooms_config.
+    :type shard: tuple
+    :return: The statistics of the shard's games.
+    :rtype: SimulationResult
+    """
+    policy_name, games, seed, max_turns, world_path = shard
+    world = None
+    if world_path is not None:
+        world = RoomFactory.load_world(world_path)
+    simulator = Simulator(world, max_turns)
+    policy = POLICIES[policy_name](simulator.tables)
+    return simulator.run(policy, games, seed)
+
+
+def run_parallel(policy_name, games, seed, workers=None, shards=64,
+                 max_turns=1000, world_path=None):
+    """
+    Plays many games on a pool of processes and merges their statistics.
+    The games are split into shards with seeds drawn from the master seed,
+    so the results are the same for a given seed and number of shards no
+    matter how many workers play them.
+
+    :param policy_name: The name of the policy in POLICIES.
+    :type policy_name: str
+    :param games: The total number of games to play.
+    :type games: int
+    :param seed: The master seed.
+    :type seed: int or None
+    :param workers: The number of processes. All the CPU cores are used if
+        it isn't given, and 1 plays the shards in this process.
+    :type workers: int or None
+    :param shards: The number of shards to split the games into.
+    :type shards: int
+    :param max_turns: The number of commands after which a game is stopped.
+    :type max_turns: int
+    :param world_path: A world definition file for the workers to load, or
+        None for the house in rooms_config.
+    :type world_path: str or None
+    :return: The merged statistics of all the games.
+    :rtype: SimulationResult
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    master_rng = random.Random(seed)
+    shard_games, extra_games = divmod(games, shards)
+    jobs = [(policy_name, shard_games + (1 if index < extra_games else 0),
+             master_rng.getrandbits(64), max_turns, world_path)
+            for index in range(shards)]
+
+    result = SimulationResult()
+    if workers == 1:
+        for job in jobs:
+            result.merge(_run_shard(job))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for shard_result in executor.map(_run_shard, jobs):
+                result.merge(shard_result)
+    return result
+
+
+def main():
+    """
+    The entry point for the simulator. Parses the command line options,
+    plays the games, and prints the outcomes and a histogram of game lengths
+    for each outcome.
+
+    :return: Nothing
+    :rtype: None
+    """
+    parser = argparse.ArgumentParser(
+        description="Simulate games of A Visit from El Chupacabras.")
+    parser.add_argument("--policy", choices=sorted(POLICIES),
+                        default="random")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--max-turns", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Play the games on this many processes. "
+                             "Defaults to one process without sharding.")
+    parser.add_argument("--shards", type=int, default=64)
+    parser.add_argument("--world",
+                        help="A JSON or TOML world definition file to play "
+                             "instead of the default house.")
+    args = parser.parse_args()
+
+    if args.world:
+        world = RoomFactory.load_world(args.world)
+    else:
+        world = RoomFactory.get_world()
+    if args.workers is None:
+        simulator = Simulator(world, args.max_turns)
+        policy = POLICIES[args.policy](simulator.tables)
+        result = simulator.run(policy, args.games, args.seed)
+    else:
+        result = run_parallel(args.policy, args.games, args.seed,
+                              args.workers, args.shards, args.max_turns,
+                              args.world)
+
+    for outcome, count in result.outcomes.most_common():
+        print(f"{outcome}: {count} ({count / result.games:.2%})")
+    print("\nRoom visits:")
+    for room_id, count in result.room_visits.most_common():
+        print(f"{world.room_names[room_id]}: {count}")
+    for outcome in ("won", "lost", "unfinished"):
+        histogram = result.get_histogram(outcome)
+        if histogram:
+            print(f"\nCommands per {outcome} game:")
+            print(histogram)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+# A solver for A Visit from El Chupacabras.
+#
+# It finds the shortest list of commands that wins the game by doing a
+# breadth-first search over the game's states. A state is the player's room
+# id and the bitmask of the items they picked up, packed into one integer,
+# so the search works the same way for the eight-room house and for
+# generated worlds with many more rooms and items.
+#
+# It also builds policy tables for the "hint" command: the best command to
+# type in every state, found with one breadth-first search backward from
+# the winning state. Tables are cached on disk by a hash of the world's
+# exits and items, so a world's table is only built once. They are cached
+# in ~/.cache/chupacabras, or in the directory named by the
+# CHUPACABRAS_CACHE_DIR environment variable if it is set.
+#
+
+import hashlib
+import os
+from array import array
+from collections import deque
+
+from main import RoomFactory, World
+
+# The largest state space that gets a flat array for its visited set. Bigger
+# state spaces fall back to a dictionary of the states actually visited.
+DENSE_STATE_LIMIT = 1 << 26
+# The action code of the "get" command in policy tables. Codes 0 to 3 are
+# the moves in World.DIRECTIONS.
+GET = World.GET
+# The policy table entry for states the game can't be won from.
+NO_ACTION = 255
+# The directory policy tables are cached in, unless CACHE_DIR_VARIABLE
+# names another one.
+POLICY_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache",
+                                "chupacabras")
+# The environment variable that overrides POLICY_CACHE_DIR.
+CACHE_DIR_VARIABLE = "CHUPACABRAS_CACHE_DIR"
+
+
+def solve(world=None):
+    """
+    Finds the shortest list of commands that wins the game.
+
+    Picking up an item as soon as the player enters its room never makes the
+    game longer, because the "get" command has to be typed at some point and
+    the items don't change where the player can go. The search uses this to
+    skip every state where the player leaves an item behind, which keeps the
+    number of states close to the number of (room, items) pairs that can
+    really be reached.
+
+    The villain room ends the game, so the search never moves out of it. The
+    number of states grows with the number of rooms times 2 to the power of
+    the number of items, so worlds with a few dozen items can still be too
+    big to search.
+
+    :param world: The layout of the house to solve. The house in
+        rooms_config is used if it isn't given.
+    :type world: World
+    :return: The winning commands, or None if the game can't be won.
+    :rtype: list or None
+    """
+    if world is None:
+        world = RoomFactory.get_world()
+    room_count = len(world.room_names)
+    item_bits = world.item_bits
+    exits = world.exits
+
+    state_count = room_count << world.total_items
+    if state_count <= DENSE_STATE_LIMIT:
+        parents = array("q", [-1]) * state_count
+        def seen(state):
+            return parents[state] != -1
+    else:
+        parents = {}
+        def seen(state):
+            return state in parents
+
+    start = world.start_room
+    parents[start] = start
+    queue = deque([start])
+    goal = world.all_items * room_count + world.villain_room
+
+    while queue:
+        state = queue.popleft()
+        if state == goal:
+            return _get_commands(world, parents, state)
+        items, room_id = divmod(state, room_count)
+        if room_id == world.villain_room:
+            continue
+
+        item_bit = item_bits[room_id]
+        if item_bit and not items & item_bit:
+            next_states = ((items | item_bit) * room_count + room_id,)
+        else:
+            next_states = (items * room_count + column[room_id]
+                           for column in exits if column[room_id] != -1)
+
+        for next_state in next_states:
+            if not seen(next_state):
+                parents[next_state] = state
+                queue.append(next_state)
+
+    return None
+
+
+def _get_commands(world, parents, state):
+    """
+    Follows the parents of a state back to the start of the game and turns
+    each step into the command that makes it.
+
+    :param world: The layout of the house.
+    :type world: World
+    :param parents: The state each state was reached from.
+    :type parents: array or dict
+    :param state: The winning state.
+    :type state: int
+    :return: The commands from the start of the game to the winning state.
+    :rtype: list
+    """
+    room_count = len(world.room_names)
+    commands = []
+    while parents[state] != state:
+        parent = parents[state]
+        room_id = state % room_count
+        parent_room_id = parent % room_count
+        if room_id == parent_room_id:
+            item_name = world.templates[room_id].item["item_name"]
+            commands.append(f"get {item_name}")
+        else:
+            for direction, column in zip(world.DIRECTIONS, world.exits):
+                if column[parent_room_id] == room_id:
+                    commands.append(f"go {direction}")
+                    break
+        state = parent
+    commands.reverse()
+    return commands
+
+
+def policy_fits(world):
+    """
+    Checks if a world is small enough to get a policy table, one byte for
+    each of its DENSE_STATE_LIMIT states at most.
+
+    :param world: The layout of the house.
+    :type world: World
+    :return: True if build_policy can build the world's table.
+    :rtype: bool
+    """
+    return len(world.room_names) << world.total_items <= DENSE_STATE_LIMIT
+
+
+def build_policy(world=None):
+    """
+    Builds the policy table of a world: the action code of the best command
+    to type in every state, indexed by the state packed as
+    items * room_count + room_id. A breadth-first search backward from the
+    winning state reaches every state that can still be won, in order of
+    how many commands it takes, so the first action found for a state is on
+    one of its shortest ways to win.
+
+    :param world: The layout of the house. The house in rooms_config is
+        used if it isn't given.
+    :type world: World
+    :return: The policy table, with NO_ACTION for the states that can't be
+        won and for the villain room.
+    :rtype: bytearray
+    :raises ValueError: If the world has more than DENSE_STATE_LIMIT
+        states.
+    """
+    if world is None:
+        world = RoomFactory.get_world()
+    room_count = len(world.room_names)
+    state_count = room_count << world.total_items
+    if not policy_fits(world):
+        raise ValueError(f"The world has {state_count} states, too many for "
+                         f"a policy table.")
+    villain_room = world.villain_room
+    item_bits = world.item_bits
+    entrances = [[] for _ in range(room_count)]
+    for action, column in enumerate(world.exits):
+        for room_id, next_room in enumerate(column):
+            if next_room != -1 and room_id != villain_room:
+                entrances[next_room].append((room_id, action))
+
+    policy = bytearray([NO_ACTION]) * state_count
+    seen = bytearray(state_count)
+    goal = world.all_items * room_count + villain_room
+    seen[goal] = 1
+    queue = deque([goal])
+    while queue:
+        state = queue.popleft()
+        items, room_id = divmod(state, room_count)
+        base = items * room_count
+        for previous_room, action in entrances[room_id]:
+            previous = base + previous_room
+            if not seen[previous]:
+                seen[previous] = 1
+                policy[previous] = action
+                queue.append(previous)
+        item_bit = item_bits[room_id]
+        if items & item_bit and room_id != villain_room:
+            previous = state - item_bit * room_count
+            if not seen[previous]:
+                seen[previous] = 1
+                policy[previous] = GET
+                queue.append(previous)
+    return policy
+
+
+def get_policy_key(world):
+    """
+    Hashes the parts of a world its policy table depends on: the exits, the
+    item rooms, and the start and villain rooms. Worlds that only differ in
+    their names share a key.
+
+    :param world: The layout of the house.
+    :type world: World
+    :return: A SHA-256 hex digest.
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    digest.update(array("q", [len(world.room_names), world.start_room,
+                              world.villain_room]).tobytes())
+    for column in world.exits:
+        digest.update(array("i", column).tobytes())
+    digest.update(array("q", world.item_rooms).tobytes())
+    return digest.hexdigest()
+
+
+def get_cache_dir():
+    """
+    Returns the directory policy tables are cached in. The environment
+    variable is read on every call, so it can be changed while the program
+    runs, for example by tests.
+
+    :return: The directory named by CHUPACABRAS_CACHE_DIR if it is set,
+        otherwise POLICY_CACHE_DIR.
+    :rtype: str
+    """
+    return os.environ.get(CACHE_DIR_VARIABLE) or POLICY_CACHE_DIR
+
+
+def load_policy(world=None, cache_dir=None):
+    """
+    Returns the policy table of a world from the disk cache, building it
+    and saving it to the cache if it isn't there. If the cache can't be
+    read or written, the table is still returned.
+
+    :param world: The layout of the house. The house in rooms_config is
+        used if it isn't given.
+    :type world: World
+    :param cache_dir: The directory policy tables are cached in. The one
+        returned by get_cache_dir is used if it isn't given.
+    :type cache_dir: str or None
+    :return: The policy table, as described in build_policy.
+    :rtype: bytes or bytearray
+    """
+    if world is None:
+        world = RoomFactory.get_world()
+    if cache_dir is None:
+        cache_dir = get_cache_dir()
+    path = os.path.join(cache_dir, f"{get_policy_key(world)}.policy")
+    state_count = len(world.room_names) << world.total_items
+    try:
+        with open(path, "rb") as policy_file:
+            policy = policy_file.read()
+        if len(policy) == state_count:
+            return policy
+    except OSError:
+        pass
+
+    policy = build_policy(world)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(temp_path, "wb") as policy_file:
+            policy_file.write(policy)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+    return policy
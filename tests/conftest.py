@@ -0,0 +1,19 @@
+# Lets the tests import the game's modules from the top of the repository,
+# and keeps the policy tables they build out of the user's cache.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def policy_cache_dir(tmp_path, monkeypatch):
+    """
+    Points the policy table cache at a temporary directory for each test.
+    """
+    cache_dir = tmp_path / "policy-cache"
+    monkeypatch.setenv("CHUPACABRAS_CACHE_DIR", str(cache_dir))
+    return cache_dir
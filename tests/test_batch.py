@@ -0,0 +1,87 @@
+# Tests that GameBatch plays by the same rules as Game.
+
+import random
+
+import pytest
+
+from batch import LOSE_REWARD, MAX_ITEMS, WIN_REWARD, GameBatch
+from main import Game, World
+from worldgen import generate_world
+
+
+def get_command(game, action):
+    """
+    Returns the command a player would type for an action code.
+    """
+    world = game.world
+    if action == World.GET:
+        item = world.templates[game.player.room_id].item
+        return f"get {item['item_name']}" if item else "get nothing"
+    if 0 <= action < World.GET:
+        return f"go {world.DIRECTIONS[action]}"
+    return "jump"
+
+
+def test_step_matches_game():
+    rng = random.Random(0)
+    size = 200
+    batch = GameBatch(size)
+    games = [Game() for _ in range(size)]
+    for _ in range(300):
+        actions = [rng.randrange(World.GET + 2) for _ in range(size)]
+        rooms, items, rewards, done = batch.step(actions)
+        for index, (game, action) in enumerate(zip(games, actions)):
+            outcome = game.player_outcome()
+            if outcome is None:
+                game.process_command(get_command(game, action))
+                new_outcome = game.player_outcome()
+                expected_reward = {None: 0, "won": WIN_REWARD,
+                                   "lost": LOSE_REWARD}[new_outcome]
+            else:
+                new_outcome = outcome
+                expected_reward = 0
+            assert (rooms[index], items[index]) == game.get_state()
+            assert done[index] == (new_outcome is not None)
+            assert rewards[index] == expected_reward
+    outcomes = {game.player_outcome() for game in games}
+    assert {"won", "lost"} <= outcomes
+
+
+def test_set_state_matches_game():
+    rng = random.Random(1)
+    batch = GameBatch(1)
+    game = Game()
+    world = game.world
+    for _ in range(500):
+        state = (rng.randrange(len(world.room_names)),
+                 rng.randrange(world.all_items + 1))
+        if state[0] == world.villain_room:
+            continue
+        batch.set_state(0, state)
+        game.set_state(state)
+        action = rng.randrange(World.GET + 1)
+        rooms, items, _, _ = batch.step([action])
+        game.process_command(get_command(game, action))
+        assert (rooms[0], items[0]) == game.get_state()
+
+
+def make_world(item_count, world_id):
+    """
+    Generates a small world with a number of items.
+    """
+    config = generate_world(item_count + 2, item_count, seed=0)
+    return World(config["rooms"], config["start_room"],
+                 config["villain_room"], world_id)
+
+
+def test_picks_up_the_last_item_bit():
+    world = make_world(MAX_ITEMS, "batch-64-items")
+    batch = GameBatch(1, world)
+    last_room = world.item_rooms[-1]
+    batch.set_state(0, (last_room, 0))
+    assert batch.step([World.GET])[1][0] == world.item_bits[last_room]
+
+
+def test_refuses_worlds_with_too_many_items():
+    with pytest.raises(ValueError):
+        GameBatch(1, make_world(MAX_ITEMS + 1, "batch-65-items"))
@@ -0,0 +1,24 @@
+# Tests for the messages a Game shows.
+
+from main import WINNING_SCRIPT, Game, World
+from worldgen import generate_world
+
+
+def test_opening_message_counts_the_world_items():
+    assert "collect 6 items" in Game().display_opening_message()
+    definition = generate_world(50, 12, seed=1)
+    world = World(definition["rooms"], definition["start_room"],
+                  definition["villain_room"], "twelve items")
+    assert "collect 12 items" in Game(world).display_opening_message()
+
+
+def test_game_only_keeps_rooms_with_items():
+    game = Game()
+    world = game.world
+    for command in WINNING_SCRIPT[:-1] + ["go west", "go south", "go east"]:
+        game.process_command(command)
+        game.display_room_status(game.player.current_room.name)
+    assert set(game.rooms.created) <= set(world.item_rooms)
+    game.reset()
+    for room_id in world.item_rooms:
+        assert game.rooms.get_by_id(room_id).has_item()
@@ -0,0 +1,57 @@
+# Tests for session journals.
+
+import random
+
+import pytest
+
+from journal import MAX_ITEMS, JournalReader, JournalWriter
+from main import Game, World
+from worldgen import generate_world
+
+
+def make_world(item_count, world_id):
+    """
+    Generates a small world with a number of items.
+    """
+    config = generate_world(item_count + 2, item_count, seed=0)
+    return World(config["rooms"], config["start_room"],
+                 config["villain_room"], world_id)
+
+
+def test_records_the_last_item_bit(tmp_path):
+    world = make_world(MAX_ITEMS, "journal-64-items")
+    game = Game(world)
+    path = tmp_path / "session.journal"
+    with JournalWriter(path, game):
+        game.set_state((world.start_room, world.all_items))
+    assert JournalReader(path).events[-1].items == world.all_items
+
+
+def test_refuses_worlds_with_too_many_items(tmp_path):
+    game = Game(make_world(MAX_ITEMS + 1, "journal-65-items"))
+    path = tmp_path / "session.journal"
+    with pytest.raises(ValueError):
+        JournalWriter(path, game)
+    assert not path.exists()
+
+
+def test_seek_matches_every_recorded_turn(tmp_path):
+    rng = random.Random(0)
+    game = Game()
+    world = game.world
+    commands = [f"go {direction}" for direction in world.DIRECTIONS]
+    commands += [f"get {name}" for name in world.item_names] + ["hint"]
+    path = tmp_path / "session.journal"
+    states = [game.get_state()]
+    with JournalWriter(path, game, checkpoint_interval=7):
+        for _ in range(300):
+            if game.player_outcome() is not None:
+                game.reset()
+            game.process_command(rng.choice(commands))
+            states.append(game.get_state())
+
+    reader = JournalReader(path)
+    assert len(reader.turns) == len(states) - 1
+    seek_game = Game()
+    for turn, state in enumerate(states):
+        assert reader.seek(turn, seek_game).get_state() == state
@@ -0,0 +1,31 @@
+# Tests that markov.analyze_random_walk agrees with simulated random games.
+
+import math
+
+from main import World
+from markov import analyze_random_walk
+from simulate import RandomPolicy, Simulator
+from worldgen import generate_world
+
+
+def test_odds_match_simulated_games():
+    config = generate_world(12, 3, seed=1)
+    world = World(config["rooms"], config["start_room"],
+                  config["villain_room"], "markov-vs-simulator")
+    exact = analyze_random_walk(world)
+    assert math.isclose(exact.won + exact.lost, 1.0)
+
+    games = 5000
+    result = Simulator(world, max_turns=100000).run(RandomPolicy(), games,
+                                                    seed=0)
+    assert result.outcomes["unfinished"] == 0
+    won = result.outcomes["won"] / games
+    assert abs(won - exact.won) < 4 * math.sqrt(
+        exact.won * exact.lost / games)
+
+    lengths = [turns for counter in result.moves.values()
+               for turns, count in counter.items() for _ in range(count)]
+    mean = sum(lengths) / games
+    variance = sum((turns - mean) ** 2 for turns in lengths) / (games - 1)
+    assert abs(mean - exact.expected_commands) < 4 * math.sqrt(
+        variance / games)
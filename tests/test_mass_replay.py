@@ -0,0 +1,48 @@
+# Tests that mass replay gives the same outcomes as replaying one by one.
+
+import random
+
+from main import WINNING_SCRIPT, Game, run_transcript
+from mass_replay import TranscriptTrie, replay_transcripts
+
+COMMANDS = ["go north", "go south", "go east", "go west", "get goat plushie",
+            "get pro camera", "get shampoo bottle", "get frying pan",
+            "get rope", "get machete", "hint", "dance", ""]
+
+
+def make_transcripts(seed, count):
+    rng = random.Random(seed)
+    openings = [[rng.choice(COMMANDS) for _ in range(rng.randint(0, 80))]
+                for _ in range(20)]
+    openings.append(WINNING_SCRIPT)
+    transcripts = [[]]
+    for _ in range(count):
+        commands = rng.choice(openings)[:rng.randint(0, 80)]
+        for _ in range(rng.randint(0, 10)):
+            if rng.random() < 0.02:
+                command = rng.choice(["q", "Q"])
+            else:
+                command = rng.choice(COMMANDS)
+            commands.append(command + rng.choice(["", "\n", "\r\n"]))
+        transcripts.append(commands)
+    transcripts += transcripts[:50]
+    return transcripts
+
+
+def test_outcomes_match_run_transcript():
+    transcripts = make_transcripts(0, 3000)
+    game = Game()
+    expected = [run_transcript(commands, game)[1]
+                for commands in transcripts]
+    assert replay_transcripts(transcripts) == expected
+    assert {"won", "lost", None} <= set(expected)
+
+
+def test_shared_commands_are_played_once():
+    trie = TranscriptTrie()
+    trie.add(["go north", "go south", "go east"])
+    trie.add(["go north", "go south", "go west"])
+    trie.add(["go north"])
+    assert trie.replay() == [None, None, None]
+    assert trie.commands == 7
+    assert trie.commands_run == 4
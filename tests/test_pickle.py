@@ -0,0 +1,71 @@
+# Tests that games, players, rooms and worlds pickle by id and come back in
+# the same state.
+
+import pickle
+
+import pytest
+
+from main import WINNING_SCRIPT, Game, RoomFactory
+from worldgen import write_world
+
+
+@pytest.fixture(params=["default", "loaded"])
+def world(request, tmp_path):
+    """
+    The default house, and a generated world loaded from a file.
+    """
+    if request.param == "default":
+        return RoomFactory.get_world()
+    write_world(tmp_path / "world.json", 30, 4, seed=0)
+    return RoomFactory.load_world(tmp_path / "world.json")
+
+
+def play_until_an_item_is_picked_up(world):
+    """
+    Returns a game in a world where the player has picked up an item and
+    stands in the room it was in.
+    """
+    game = Game(world)
+    room_id = world.item_rooms[0]
+    game.set_state((room_id, 0))
+    game.process_command(f"get {world.item_names[0]}")
+    assert game.player.items
+    return game
+
+
+def test_game_round_trip(world):
+    game = play_until_an_item_is_picked_up(world)
+    restored = pickle.loads(pickle.dumps(game))
+    assert restored.world is world
+    assert restored.get_state() == game.get_state()
+    assert restored.display_player_status() == game.display_player_status()
+
+
+def test_player_round_trip(world):
+    player = play_until_an_item_is_picked_up(world).player
+    restored = pickle.loads(pickle.dumps(player))
+    assert restored.world is world
+    assert (restored.room_id, restored.items) == \
+        (player.room_id, player.items)
+    assert restored.get_player_status() == player.get_player_status()
+
+
+def test_room_round_trip(world):
+    room = play_until_an_item_is_picked_up(world).player.current_room
+    assert not room.has_item()
+    restored = pickle.loads(pickle.dumps(room))
+    assert restored.template is room.template
+    assert not restored.has_item()
+    assert restored.get_room_status() == room.get_room_status()
+
+
+def test_world_round_trip(world):
+    assert pickle.loads(pickle.dumps(world)) is world
+
+
+def test_default_game_after_winning_round_trip():
+    game = Game()
+    for command in WINNING_SCRIPT:
+        game.process_command(command)
+    restored = pickle.loads(pickle.dumps(game))
+    assert restored.player_outcome() == game.player_outcome() == "won"
@@ -0,0 +1,25 @@
+# Tests for how Player lists the items picked up.
+
+from main import Game
+
+
+def test_inventory_is_in_pickup_order():
+    game = Game()
+    for command in ["go north", "get pro camera", "go south", "go east",
+                    "get goat plushie"]:
+        game.process_command(command)
+    assert game.player.inventory == ["pro camera", "goat plushie"]
+    assert game.player.get_player_status().endswith(
+        "You have pro camera, goat plushie.")
+
+
+def test_inventory_follows_set_state():
+    game = Game()
+    for command in ["go north", "get pro camera", "go south", "go east",
+                    "get goat plushie"]:
+        game.process_command(command)
+    state = game.get_state()
+    game.reset()
+    assert game.player.inventory == []
+    game.set_state(state)
+    assert sorted(game.player.inventory) == ["goat plushie", "pro camera"]
@@ -0,0 +1,36 @@
+# Tests for server.GameServer, played over a real connection.
+
+import asyncio
+
+from journal import STARTED, JournalReader
+from main import WINNING_SCRIPT
+from server import COMMAND_PROMPT, REPLAY_PROMPT, GameServer
+
+
+async def play(server, answers):
+    """
+    Plays the winning game once per answer to the replay prompt, and reads
+    until the server disconnects.
+    """
+    await server.start()
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    for answer in answers:
+        for command in WINNING_SCRIPT:
+            await reader.readuntil(COMMAND_PROMPT.encode())
+            writer.write(command.encode() + b"\n")
+        await reader.readuntil(REPLAY_PROMPT.encode())
+        writer.write(answer.encode() + b"\n")
+    await reader.read()
+    writer.close()
+    await writer.wait_closed()
+    server._server.close()
+    await server._server.wait_closed()
+
+
+def test_journal_starts_once_per_game(tmp_path):
+    server = GameServer(port=0, journal_dir=str(tmp_path))
+    asyncio.run(play(server, ["y", "n"]))
+    (path,) = tmp_path.glob("*.journal")
+    events = JournalReader(path).events
+    assert [event.kind for event in events].count(STARTED) == 2
+    assert events[-1].outcome == "won"
@@ -0,0 +1,46 @@
+# Tests for session_store.SessionStore.
+
+from main import RoomFactory
+from session_store import SessionStore
+from worldgen import write_world
+
+
+def test_reopened_session_is_saved(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    with SessionStore(path, commit_interval=0) as store:
+        game = store.open_session("player")
+        game.process_command("go east")
+        store.close_session("player")
+
+        game = store.open_session("player")
+        game.process_command("get goat plushie")
+        state = game.get_state()
+
+    with SessionStore(path) as store:
+        assert store.open_session("player").get_state() == state
+
+
+def test_session_is_saved_after_eviction(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    with SessionStore(path, commit_interval=0, cache_size=1) as store:
+        game = store.open_session("first")
+        store.open_session("second")
+        assert store.open_session("first") is game
+        game.process_command("go north")
+        state = game.get_state()
+
+    with SessionStore(path) as store:
+        assert store.open_session("first").get_state() == state
+
+
+def test_session_with_many_items_is_saved(tmp_path):
+    write_world(tmp_path / "world.json", 72, 70, seed=0)
+    world = RoomFactory.load_world(tmp_path / "world.json")
+    path = str(tmp_path / "sessions.db")
+    with SessionStore(path, commit_interval=0) as store:
+        game = store.open_session("player", world)
+        game.set_state((world.start_room, world.all_items))
+
+    with SessionStore(path) as store:
+        assert store.open_session("player").get_state() == \
+            (world.start_room, world.all_items)
@@ -0,0 +1,17 @@
+# Tests for the policy tables solver.py caches on disk.
+
+from main import RoomFactory
+from solver import build_policy, get_policy_key, load_policy
+
+
+def test_policy_is_cached_in_the_configured_directory(policy_cache_dir):
+    key = get_policy_key(RoomFactory.get_world())
+    policy = load_policy()
+    assert (policy_cache_dir / f"{key}.policy").read_bytes() == policy
+    assert load_policy() == policy
+
+
+def test_unreadable_cache_is_rebuilt(tmp_path):
+    key = get_policy_key(RoomFactory.get_world())
+    (tmp_path / f"{key}.policy").mkdir()
+    assert load_policy(cache_dir=str(tmp_path)) == build_policy()
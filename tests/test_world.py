@@ -0,0 +1,144 @@
+# Tests for the checks World.analyze runs on a world's layout.
+
+import random
+
+import pytest
+
+from compiled_world import HEADER, MappedWorld, compile_world
+from main import Game, RoomFactory, World
+from solver import solve
+from worldgen import write_world
+
+
+def make_room(name, exits, item_name=None):
+    item = None
+    if item_name is not None:
+        item = {"item_name": item_name, "item_use": "It helps."}
+    return {"name": name, "item": item, "exits": exits}
+
+
+def test_items_with_the_same_name_are_checked():
+    config = {
+        "cellar": make_room("cellar", {}, "rope"),
+        "hall": make_room("hall", {"east": "yard"}, "rope"),
+        "yard": make_room("yard", {"west": "hall"}),
+    }
+    report = World(config, "hall", "yard").report
+    assert len(report.errors) == 2
+    assert any("cellar" in error and "picked up" in error
+               for error in report.errors)
+    assert any("same name" in error for error in report.errors)
+
+
+def test_dead_end_item_room_is_an_error():
+    config = {
+        "hall": make_room("hall", {"east": "yard", "north": "closet"}),
+        "yard": make_room("yard", {"west": "hall"}),
+        "closet": make_room("closet", {}, "rope"),
+    }
+    world = World(config, "hall", "yard")
+    assert solve(world) is None
+    assert not world.report.is_valid()
+
+
+def test_items_on_separate_one_way_paths_are_an_error():
+    config = {
+        "hall": make_room("hall", {"north": "attic", "south": "cellar"}),
+        "attic": make_room("attic", {"east": "yard"}, "rope"),
+        "cellar": make_room("cellar", {"east": "yard"}, "pan"),
+        "yard": make_room("yard", {}),
+    }
+    world = World(config, "hall", "yard")
+    assert solve(world) is None
+    assert not world.report.is_valid()
+
+
+def test_items_on_one_one_way_path_are_valid():
+    config = {
+        "hall": make_room("hall", {"north": "attic"}),
+        "attic": make_room("attic", {"east": "cellar"}, "rope"),
+        "cellar": make_room("cellar", {"east": "yard"}, "pan"),
+        "yard": make_room("yard", {}),
+    }
+    world = World(config, "hall", "yard")
+    assert solve(world) is not None
+    assert world.report.is_valid()
+
+
+def test_report_matches_solver_on_random_worlds():
+    rng = random.Random(0)
+    for _ in range(2000):
+        names = [f"room {index}" for index in range(rng.randint(2, 6))]
+        item_rooms = rng.sample(names, rng.randint(0, min(3, len(names))))
+        config = {}
+        for name in names:
+            exits = {direction: rng.choice(names)
+                     for direction in World.DIRECTIONS
+                     if rng.random() < 0.35}
+            item_name = f"{name} item" if name in item_rooms else None
+            config[name] = make_room(name, exits, item_name)
+        start_room, villain_room = rng.sample(names, 2)
+        world = World(config, start_room, villain_room)
+        assert world.report.is_valid() == (solve(world) is not None)
+
+
+def test_mapped_world_returns_stored_report(tmp_path):
+    world = RoomFactory.get_world()
+    path = str(tmp_path / "house.chupa")
+    compile_world(world, path)
+    mapped_world = MappedWorld(path)
+    try:
+        report = mapped_world.analyze()
+        assert report.errors == world.report.errors
+        assert report.warnings == world.report.warnings
+    finally:
+        mapped_world.close()
+
+
+def test_loading_a_compiled_world_again_reads_only_its_header(tmp_path):
+    world = World({"hall": {"name": "hall", "exits": {"east": "yard"}},
+                   "yard": {"name": "yard", "exits": {}}},
+                  "hall", "yard", "compiled-reload")
+    path = tmp_path / "reload.chupa"
+    compile_world(world, path)
+    loaded = RoomFactory.load_world(path)
+    with open(path, "r+b") as world_file:
+        world_file.truncate(HEADER.size)
+    assert RoomFactory.load_world(path) is loaded
+
+
+def test_long_world_ids_are_not_compiled(tmp_path):
+    world = World({"hall": {"name": "hall", "exits": {"east": "yard"}},
+                   "yard": {"name": "yard", "exits": {}}},
+                  "hall", "yard", "x" * 65)
+    with pytest.raises(ValueError):
+        compile_world(world, tmp_path / "long.chupa")
+
+
+def test_compiled_world_plays_like_its_json_world(tmp_path):
+    write_world(tmp_path / "world.json", 200, 6, seed=3)
+    world = RoomFactory.load_world(tmp_path / "world.json")
+    path = str(tmp_path / "world.chupa")
+    compile_world(world, path)
+    mapped_world = MappedWorld(path)
+    try:
+        assert mapped_world.world_id == world.world_id
+        assert list(mapped_world.room_names) == list(world.room_names)
+        rng = random.Random(0)
+        commands = [f"go {direction}" for direction in World.DIRECTIONS]
+        commands += [f"get {name}" for name in world.item_names]
+        commands += ["hint", "jump"]
+        game = Game(world)
+        mapped_game = Game(mapped_world)
+        for _ in range(2000):
+            if game.player_outcome() is not None:
+                game.reset()
+                mapped_game.reset()
+            command = rng.choice(commands)
+            assert mapped_game.process_command(command) == \
+                game.process_command(command)
+            assert mapped_game.get_state() == game.get_state()
+            assert mapped_game.display_player_status() == \
+                game.display_player_status()
+    finally:
+        mapped_world.close()
@@ -0,0 +1,214 @@
+# A procedural house generator for A Visit from El Chupacabras.
+#
+# It makes worlds far bigger than the eight-room house for load and scale
+# testing. The rooms are laid out on a grid and joined by a random spanning
+# tree, so every room can be reached, and then some extra doors are added
+# to make loops. Every exit leads back the way it came. The villain room
+# hangs off the east side of the last room and is only joined to that room,
+# so every item can always be picked up before meeting el Chupacabras.
+#
+# Worlds are generated one row of the grid at a time and written straight
+# to a JSON world definition file, so even a world with a million rooms is
+# never held in memory.
+#
+# Usage: python worldgen.py OUTPUT_FILE [--rooms N] [--items M] [--seed S]
+#                           [--extra-doors P] [--villain-room NAME]
+#
+
+import argparse
+import json
+import math
+import random
+
+# The bits that say which doors a grid room has toward its west and north
+# neighbours.
+WEST_DOOR = 1
+NORTH_DOOR = 2
+
+
+def _choose_doors(rng, row, width, room_count, extra_doors):
+    """
+    Chooses the west and north doors of every room in one row of the grid.
+    Every room but the first gets one door toward a room that comes before
+    it, which joins all the rooms into a spanning tree. The other door is
+    added with a probability of extra_doors.
+
+    :param rng: The random number generator.
+    :type rng: random.Random
+    :param row: The row number.
+    :type row: int
+    :param width: The number of rooms in a full row.
+    :type width: int
+    :param room_count: The number of grid rooms.
+    :type room_count: int
+    :param extra_doors: The chance of adding a second door to a room.
+    :type extra_doors: float
+    :return: A list with the door bits of each room in the row.
+    :rtype: list
+    """
+    first = row * width
+    doors = []
+    for column in range(min(width, room_count - first)):
+        if row == 0:
+            doors.append(WEST_DOOR if column else 0)
+        elif column == 0:
+            doors.append(NORTH_DOOR)
+        else:
+            door = WEST_DOOR if rng.random() < 0.5 else NORTH_DOOR
+            if rng.random() < extra_doors:
+                door = WEST_DOOR | NORTH_DOOR
+            doors.append(door)
+    return doors
+
+
+def iter_rooms(room_count, item_count, seed=None, extra_doors=0.1,
+               villain_room="backyard"):
+    """
+    Generates the rooms of a world one at a time, in the shape of the
+    values of rooms_config. The first room is the start room and the last
+    one is the villain room.
+
+    :param room_count: The number of rooms, including the villain room. It
+        must be at least 2.
+    :type room_count: int
+    :param item_count: The number of items. It must be less than
+        room_count.
+    :type item_count: int
+    :param seed: The seed of the random number generator, so the same world
+        can be made again.
+    :type seed: int or None
+    :param extra_doors: The chance of each room getting a second door,
+        which adds loops to the house.
+    :type extra_doors: float
+    :param villain_room: The name of the villain room.
+    :type villain_room: str
+    :return: A generator of room dictionaries with the name, item and exits
+        of each room.
+    :rtype: generator
+    """
+    if room_count < 2:
+        raise ValueError("A world needs at least a start room and a "
+                         "villain room.")
+    if not 0 <= item_count < room_count:
+        raise ValueError("Every item needs its own room, and the villain "
+                         "room can't have one.")
+    rng = random.Random(seed)
+    grid_rooms = room_count - 1
+    width = math.isqrt(grid_rooms - 1) + 1
+    item_rooms = set(rng.sample(range(grid_rooms), item_count))
+
+    row_doors = _choose_doors(rng, 0, width, grid_rooms, extra_doors)
+    for row in range(math.ceil(grid_rooms / width)):
+        next_doors = _choose_doors(rng, row + 1, width, grid_rooms,
+                                   extra_doors)
+        first = row * width
+        for column, doors in enumerate(row_doors):
+            room_id = first + column
+            exits = {}
+            if doors & NORTH_DOOR:
+                exits["north"] = f"room {room_id - width}"
+            if column + 1 < len(row_doors) and \
+                    row_doors[column + 1] & WEST_DOOR:
+                exits["east"] = f"room {room_id + 1}"
+            if column < len(next_doors) and \
+                    next_doors[column] & NORTH_DOOR:
+                exits["south"] = f"room {room_id + width}"
+            if doors & WEST_DOOR:
+                exits["west"] = f"room {room_id - 1}"
+            if room_id == grid_rooms - 1:
+                exits["east"] = villain_room
+
+            item = None
+            if room_id in item_rooms:
+                item = {"item_name": f"item {room_id}",
+                        "item_use": "fight el Chupacabras"}
+            yield {"name": f"room {room_id}", "item": item, "exits": exits}
+        row_doors = next_doors
+
+    yield {"name": villain_room, "item": None,
+           "exits": {"west": f"room {grid_rooms - 1}"}}
+
+
+def generate_world(room_count, item_count, seed=None, extra_doors=0.1,
+                   villain_room="backyard"):
+    """
+    Generates a world definition in memory, in the same shape as the world
+    definition files read by RoomFactory.load_world.
+
+    :param room_count: The number of rooms, including the villain room.
+    :type room_count: int
+    :param item_count: The number of items.
+    :type item_count: int
+    :param seed: The seed of the random number generator.
+    :type seed: int or None
+    :param extra_doors: The chance of each room getting a second door.
+    :type extra_doors: float
+    :param villain_room: The name of the villain room.
+    :type villain_room: str
+    :return: A dictionary with the start room, the villain room and the
+        rooms.
+    :rtype: dict
+    """
+    rooms = {room["name"]: room
+             for room in iter_rooms(room_count, item_count, seed,
+                                    extra_doors, villain_room)}
+    return {"start_room": "room 0", "villain_room": villain_room,
+            "rooms": rooms}
+
+
+def write_world(path, room_count, item_count, seed=None, extra_doors=0.1,
+                villain_room="backyard"):
+    """
+    Generates a world and writes it to a JSON world definition file one
+    room at a time.
+
+    :param path: The file to write.
+    :type path: str
+    :param room_count: The number of rooms, including the villain room.
+    :type room_count: int
+    :param item_count: The number of items.
+    :type item_count: int
+    :param seed: The seed of the random number generator.
+    :type seed: int or None
+    :param extra_doors: The chance of each room getting a second door.
+    :type extra_doors: float
+    :param villain_room: The name of the villain room.
+    :type villain_room: str
+    """
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    with open(path, "w", encoding="utf-8") as world_file:
+        world_file.write(f'{{"start_room": "room 0", "villain_room": '
+                         f'{encode(villain_room)}, "rooms": {{\n')
+        separator = ""
+        for room in iter_rooms(room_count, item_count, seed, extra_doors,
+                               villain_room):
+            world_file.write(f"{separator}{encode(room['name'])}: "
+                             f"{encode(room)}")
+            separator = ",\n"
+        world_file.write("\n}}\n")
+
+
+def main():
+    """
+    The entry point for the generator. Parses the command line options and
+    writes the world.
+
+    :return: Nothing
+    :rtype: None
+    """
+    parser = argparse.ArgumentParser(
+        description="Generate a house for A Visit from El Chupacabras.")
+    parser.add_argument("output_file")
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--extra-doors", type=float, default=0.1)
+    parser.add_argument("--villain-room", default="backyard")
+    args = parser.parse_args()
+
+    write_world(args.output_file, args.rooms, args.items, args.seed,
+                args.extra_doors, args.villain_room)
+
+
+if __name__ == '__main__':
+    main()